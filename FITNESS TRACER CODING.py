@@ -1,142 +1,102 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from tkcalendar import Calendar
-from datetime import datetime, timedelta
-import pandas as pd
-import os
-import json
-import hashlib
-from matplotlib import pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import atexit
+import datetime
+import importlib
+import sys
+import threading
+import diagnostics
+from worker import BackgroundWriter
 
-# Configuration
-DATA_FILE = "fitness_tracker_data.xlsx"
-USERS_SHEET = "Users"
-WEIGHT_SHEET = "Weight"
-FOOD_SHEET = "Food"
-WORKOUT_SHEET = "Workout"
+# Startup only needs tkinter: pandas (via service/storage), matplotlib and
+# tkcalendar are imported where they are first used, and prewarmed on
+# background threads while the user is busy with the window in front of them.
+# benchmarks/startup.py checks that this stays true.
 
-# Muscle group exercise plan
-muscle_workout_plan = {
-    "Monday": ("Cardio + Shoulders", ["Running (30min)", "Military Press", "Lateral Raise"]),
-    "Tuesday": ("Cardio + Chest", ["Cycling (30min)", "Bench Press", "Incline Dumbbell Press"]),
-    "Wednesday": ("Cardio + Back", ["Swimming (30min)", "Pull-ups", "Deadlift"]),
-    "Thursday": ("Cardio + Abs", ["Jump Rope (30min)", "Plank", "Crunches"]),
-    "Friday": ("Cardio + Arms", ["Rowing (30min)", "Barbell Curl", "Skull Crusher"]),
-    "Saturday": ("Cardio + Legs", ["HIIT (30min)", "Squats", "Lunges"]),
-    "Sunday": ("Rest", [])
-}
+# Writes made from Tk callbacks run on this worker; it is flushed on exit
+writer = BackgroundWriter()
 
-# Meal plans
-meal_plans = {
-    "Weight Loss": {
-        "Vegetarian": {
-            "Breakfast": {"item": "Oats with berries", "calories": 250, "protein": 10},
-            "Lunch": {"item": "Salad with lentils", "calories": 300, "protein": 15},
-            "Dinner": {"item": "Grilled vegetables with quinoa", "calories": 350, "protein": 12},
-            "Snacks": {"item": "Greek yogurt", "calories": 100, "protein": 8}
-        },
-        "Non-Vegetarian": {
-            "Breakfast": {"item": "Egg whites with spinach", "calories": 250, "protein": 20},
-            "Lunch": {"item": "Grilled chicken with vegetables", "calories": 300, "protein": 30},
-            "Dinner": {"item": "Baked fish with asparagus", "calories": 350, "protein": 25},
-            "Snacks": {"item": "Protein shake", "calories": 100, "protein": 20}
-        }
-    },
-    "Weight Gain": {
-        "Vegetarian": {
-            "Breakfast": {"item": "Paneer + Oats", "calories": 500, "protein": 30},
-            "Lunch": {"item": "Lentils + Rice + Curd", "calories": 600, "protein": 35},
-            "Dinner": {"item": "Tofu + Veggies + Quinoa", "calories": 550, "protein": 40},
-            "Snacks": {"item": "Nuts + Banana", "calories": 300, "protein": 10}
-        },
-        "Non-Vegetarian": {
-            "Breakfast": {"item": "Eggs + Toast", "calories": 500, "protein": 30},
-            "Lunch": {"item": "Chicken + Rice + Veggies", "calories": 600, "protein": 35},
-            "Dinner": {"item": "Fish + Brown Rice + Salad", "calories": 550, "protein": 40},
-            "Snacks": {"item": "Protein bar", "calories": 300, "protein": 20}
-        }
-    }
-}
+_service = None
+_service_lock = threading.Lock()
 
 # Helper functions
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+def get_service():
+    # Created on first use; the first call also creates/migrates the database
+    global _service
+    with _service_lock:
+        if _service is None:
+            from service import TrackerService
+            service = TrackerService()
+            service.initialize()
+            _service = service
+    return _service
 
-def initialize_data_file():
-    if not os.path.exists(DATA_FILE):
-        with pd.ExcelWriter(DATA_FILE, engine='openpyxl') as writer:
-            # Users sheet
-            pd.DataFrame(columns=["Username", "PasswordHash"]).to_excel(
-                writer, sheet_name=USERS_SHEET, index=False)
-            # Weight sheet
-            pd.DataFrame(columns=["Username", "Date", "Weight (kg)", "Goal Type", "Current Goal (kg)", "Active"]).to_excel(
-                writer, sheet_name=WEIGHT_SHEET, index=False)
-            # Food sheet
-            pd.DataFrame(columns=["Username", "Date", "Meal Type", "Food Item", "Calories", "Protein (g)", "Vegetarian"]).to_excel(
-                writer, sheet_name=FOOD_SHEET, index=False)
-            # Workout sheet
-            pd.DataFrame(columns=["Username", "Date", "Muscle Group", "Exercise", "Sets", "Reps", "Duration (min)", "Completed"]).to_excel(
-                writer, sheet_name=WORKOUT_SHEET, index=False)
-
-def save_data(data, sheet_name):
-    try:
-        existing_data = pd.read_excel(DATA_FILE, sheet_name=sheet_name)
-        new_data = pd.DataFrame([data] if isinstance(data, dict) else data)
-        combined_data = pd.concat([existing_data, new_data], ignore_index=True)
-        combined_data = combined_data.drop_duplicates()
-        
-        with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-            combined_data.to_excel(writer, sheet_name=sheet_name, index=False)
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to save data: {str(e)}")
-
-def get_user_goals(username):
-    try:
-        df = pd.read_excel(DATA_FILE, sheet_name=WEIGHT_SHEET)
-        user_goals = df[df['Username'] == username]
-        return user_goals
-    except Exception:
-        return pd.DataFrame()
-
-def get_active_goal(username):
-    user_goals = get_user_goals(username)
-    if not user_goals.empty:
-        active_goals = user_goals[user_goals['Active'] == True]
-        if not active_goals.empty:
-            return active_goals.iloc[-1]  # Return most recent active goal
-    return None
-
-def authenticate_user(username, password):
-    try:
-        users_df = pd.read_excel(DATA_FILE, sheet_name=USERS_SHEET)
-        user_record = users_df[users_df['Username'] == username]
-        if not user_record.empty and user_record.iloc[0]['PasswordHash'] == hash_password(password):
-            return True
-        return False
-    except Exception:
-        return False
+def prewarm(*targets):
+    # Imports modules (or runs loaders) on a background thread so they are
+    # ready by the time the UI needs them; failures surface on real use instead
+    def run():
+        for target in targets:
+            try:
+                target() if callable(target) else importlib.import_module(target)
+            except Exception as e:
+                diagnostics.log_exception("prewarm", e, target=str(target))
+                print(f"Prewarm of {target} failed: {e}", file=sys.stderr)
+    threading.Thread(target=run, name="prewarm", daemon=True).start()
 
-def register_user(username, password):
-    try:
-        users_df = pd.read_excel(DATA_FILE, sheet_name=USERS_SHEET)
-        if username in users_df['Username'].values:
-            return False  # Username exists
-        
-        new_user = {
-            "Username": username,
-            "PasswordHash": hash_password(password)
-        }
-        save_data(new_user, USERS_SHEET)
-        return True
-    except Exception:
-        return False
+def show_save_error(e):
+    # The writer has already logged the failure
+    messagebox.showerror("Error", f"Failed to save data: {str(e)}")
 
-# Initialize data file
-initialize_data_file()
+def show_diagnostics(root):
+    # Recent operation latencies (storage, rendering, login), cache and write
+    # queue state; refreshed every second while open. Opened with F12.
+    win = tk.Toplevel(root)
+    win.title("Diagnostics")
+    win.geometry("820x480")
+    win.configure(bg="#1e1e1e")
+    
+    columns = ("count", "p50", "p95", "max", "rows", "errors")
+    tree = ttk.Treeview(win, columns=columns, height=15)
+    tree.heading("#0", text="Operation")
+    tree.column("#0", width=220)
+    for column in columns:
+        tree.heading(column, text=column)
+        tree.column(column, width=90, anchor='e')
+    tree.pack(fill='both', expand=True, padx=10, pady=10)
+    
+    status_label = tk.Label(win, font=("Consolas", 10), bg="#1e1e1e", fg="#dfe6e9", justify='left')
+    status_label.pack(anchor='w', padx=10, pady=(0, 10))
+    
+    def refresh():
+        if not win.winfo_exists():
+            return
+        stats = diagnostics.stats()
+        for op in set(tree.get_children()) - set(stats):
+            tree.delete(op)
+        for op, entry in stats.items():
+            values = (entry['count'], f"{entry['p50_ms']:.1f} ms", f"{entry['p95_ms']:.1f} ms",
+                      f"{entry['max_ms']:.1f} ms", entry['last_rows'] if entry['last_rows'] is not None else "",
+                      entry['errors'])
+            if tree.exists(op):
+                tree.item(op, values=values)
+            else:
+                tree.insert("", "end", iid=op, text=op, values=values)
+        
+        lines = [f"Pending writes: {writer.pending()}"]
+        storage = _service.storage if _service is not None else None
+        if storage is not None and hasattr(storage, "stats"):
+            cache = storage.stats()
+            lines.append(f"Cache: {cache['hits']} hits, {cache['misses']} misses, "
+                         f"{cache['invalidations']} invalidations")
+            lines.append("Cached rows: " + ", ".join(f"{sheet} {rows}" for sheet, rows in cache['rows'].items()))
+        status_label.config(text="\n".join(lines))
+        win.after(1000, refresh)
+    
+    refresh()
 
-# Global variable to track current user
-current_user = None
+def commit_async(batch, on_error=show_save_error, on_done=None):
+    # All writes in the batch land in a single transaction
+    writer.submit(get_service().storage.commit, batch, on_done=on_done, on_error=on_error)
 
 # --- Login/Signup Window ---
 class AuthWindow:
@@ -225,11 +185,16 @@ class AuthWindow:
             self.login_status.config(text="Username and password required", fg="#d63031")
             return
         
-        if authenticate_user(username, password):
-            global current_user
-            current_user = username
+        try:
+            session = get_service().authenticate(username, password)
+        except Exception as e:
+            diagnostics.log_exception("login", e)
+            self.login_status.config(text=f"Could not log in: {e}", fg="#d63031")
+            return
+        
+        if session is not None:
             self.root.destroy()
-            show_main_window()
+            show_main_window(session)
         else:
             self.login_status.config(text="Invalid username or password", fg="#d63031")
     
@@ -246,33 +211,48 @@ class AuthWindow:
             self.signup_status.config(text="Passwords don't match", fg="#d63031")
             return
         
-        if register_user(username, password):
+        try:
+            registered = get_service().register(username, password)
+        except Exception as e:
+            diagnostics.log_exception("signup", e)
+            self.signup_status.config(text=f"Could not create account: {e}", fg="#d63031")
+            return
+        
+        if registered:
             self.signup_status.config(text="Account created successfully! Please login.", fg="#00b894")
             self.notebook.select(0)  # Switch to login tab
         else:
             self.signup_status.config(text="Username already exists", fg="#d63031")
 
 # --- Main Application Window ---
-def show_main_window():
+def show_main_window(session):
     root = tk.Tk()
-    root.title(f"Fitness Tracker - {current_user}")
+    root.title(f"Fitness Tracker - {session.username}")
     root.geometry("1000x700")
     root.configure(bg="#121212")
+    writer.attach(root)
+    root.bind_all("<F12>", lambda event: show_diagnostics(root))
     
-    # Check for active goal
-    active_goal = get_active_goal(current_user)
+    # Check for active goal; if it cannot be read, start from goal selection
+    try:
+        active_goal = session.active_goal()
+    except Exception as e:
+        diagnostics.log_exception("active_goal", e, user=session.username)
+        active_goal = None
     
     if active_goal is None:
-        show_goal_window(root)
+        show_goal_window(root, session)
     else:
-        show_calendar_dashboard(root, active_goal['Weight (kg)'], 
+        show_calendar_dashboard(root, session, active_goal['Weight (kg)'], 
                                active_goal['Current Goal (kg)'], 
-                               active_goal['Goal Type'])
+                               active_goal['Goal Type'], active_goal['Date'])
     
+    # Reports are the only user of matplotlib; load it while the dashboard is idle
+    root.after_idle(prewarm, "reports", "matplotlib.backends.backend_tkagg")
     root.mainloop()
 
 # --- Goal Window ---
-def show_goal_window(root):
+def show_goal_window(root, session):
     for widget in root.winfo_children():
         widget.destroy()
     
@@ -284,13 +264,13 @@ def show_goal_window(root):
     button_frame.pack(expand=True)
     
     tk.Button(button_frame, text="WEIGHT GAIN", font=("Segoe UI Black", 14), 
-             bg="#00b894", fg="white", width=18, command=lambda: open_weight_input(root, "Weight Gain")).pack(pady=10)
+             bg="#00b894", fg="white", width=18, command=lambda: open_weight_input(root, session, "Weight Gain")).pack(pady=10)
     
     tk.Button(button_frame, text="WEIGHT LOSS", font=("Segoe UI Black", 14), 
-             bg="#d63031", fg="white", width=18, command=lambda: open_weight_input(root, "Weight Loss")).pack(pady=10)
+             bg="#d63031", fg="white", width=18, command=lambda: open_weight_input(root, session, "Weight Loss")).pack(pady=10)
 
 # --- Weight Input Window ---
-def open_weight_input(root, goal_type):
+def open_weight_input(root, session, goal_type):
     for widget in root.winfo_children():
         widget.destroy()
     
@@ -317,48 +297,35 @@ def open_weight_input(root, goal_type):
         try:
             current_weight = float(current_entry.get())
             goal_weight = float(goal_entry.get())
-            
-            if goal_type == "Weight Gain" and goal_weight <= current_weight:
-                status_label.config(text="Goal must be greater than current weight", fg="#e17055")
-            elif goal_type == "Weight Loss" and goal_weight >= current_weight:
-                status_label.config(text="Goal must be less than current weight", fg="#e17055")
-            else:
-                # Save the new goal (mark as active)
-                today = datetime.today().strftime('%Y-%m-%d')
-                weight_data = {
-                    "Username": current_user,
-                    "Date": today,
-                    "Weight (kg)": current_weight,
-                    "Goal Type": goal_type,
-                    "Current Goal (kg)": goal_weight,
-                    "Active": True
-                }
-                
-                # Mark any previous goals as inactive
-                try:
-                    df = pd.read_excel(DATA_FILE, sheet_name=WEIGHT_SHEET)
-                    df.loc[df['Username'] == current_user, 'Active'] = False
-                    with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                        df.to_excel(writer, sheet_name=WEIGHT_SHEET, index=False)
-                except Exception:
-                    pass
-                
-                save_data(weight_data, WEIGHT_SHEET)
-                show_calendar_dashboard(root, current_weight, goal_weight, goal_type)
         except ValueError:
             status_label.config(text="Please enter valid numbers", fg="#e17055")
+            return
+        
+        try:
+            batch = session.start_goal(goal_type, current_weight, goal_weight)
+        except ValueError as e:
+            status_label.config(text=str(e), fg="#e17055")
+            return
+        
+        commit_async(batch, on_error=lambda e: messagebox.showerror("Error", f"Failed to save goal: {str(e)}"))
+        show_calendar_dashboard(root, session, current_weight, goal_weight, goal_type)
     
     tk.Button(button_frame, text="Submit", font=("Segoe UI Black", 14), bg="#0984e3", 
              fg="white", command=submit_goal).pack(side=tk.LEFT, padx=10)
     
     tk.Button(button_frame, text="Back", font=("Segoe UI Black", 14), bg="#d63031", 
-             fg="white", command=lambda: show_goal_window(root)).pack(side=tk.LEFT, padx=10)
+             fg="white", command=lambda: show_goal_window(root, session)).pack(side=tk.LEFT, padx=10)
 
 # --- Calendar Dashboard ---
-def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
+def show_calendar_dashboard(root, session, current_weight, goal_weight, goal_type, start_date=None):
     for widget in root.winfo_children():
         widget.destroy()
     
+    # A new goal starts today; its start date limits the deadline's trend to
+    # the weights logged since
+    goal = {"Date": start_date or datetime.date.today().isoformat(), "Weight (kg)": current_weight,
+            "Current Goal (kg)": goal_weight, "Goal Type": goal_type}
+    
     main_frame = tk.Frame(root, bg="#1e1e1e")
     main_frame.pack(fill='both', expand=True, padx=10, pady=10)
     
@@ -371,10 +338,37 @@ def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
     calendar_frame = tk.Frame(main_frame, bg="#1e1e1e")
     calendar_frame.pack(fill='both', expand=True)
     
+    from tkcalendar import Calendar
+    
     calendar = Calendar(calendar_frame, selectmode='day', date_pattern='yyyy-mm-dd', 
                        font=("Segoe UI", 14), background="#2c2c2c", foreground='white')
     calendar.pack(fill='both', expand=True, padx=20, pady=10)
     
+    # Day status colours; events are created once from the completion index
+    # and replaced one day at a time on "Mark as Done"
+    calendar.tag_config("completed", background="#00b894", foreground="white")
+    calendar.tag_config("partial", background="#fdcb6e", foreground="black")
+    calendar.tag_config("missed", background="#d63031", foreground="white")
+    completion = {}
+    
+    def set_day_status(date, status):
+        day = datetime.date.fromisoformat(date)
+        for event in calendar.get_calevents(date=day):
+            calendar.calevent_remove(event)
+        calendar.calevent_create(day, status.capitalize(), tags=status)
+    
+    def load_completion():
+        try:
+            index = session.completion_index(goal, start_date)
+        except Exception as e:
+            diagnostics.log_exception("completion_index", e, user=session.username)
+            return
+        completion['index'] = index
+        for date, status in index.statuses():
+            set_day_status(date, status)
+    
+    root.after_idle(load_completion)
+    
     info_label = tk.Label(main_frame, text="Select a date to view your plan and mark it as done.",
                          font=("Segoe UI", 13), bg="#1e1e1e", fg="#ffffff")
     info_label.pack()
@@ -387,29 +381,32 @@ def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
     button_frame.pack(pady=10)
     
     def calculate_deadline():
-        today = datetime.today()
-        if goal_type == "Weight Gain":
-            days_left = (goal_weight - current_weight) / 0.5  # 0.5kg per week
-        else:
-            days_left = (current_weight - goal_weight) / 0.5
-            
-        deadline = today + timedelta(days=days_left * 7)
+        # Follows the trend of the logged weights once there are enough of
+        # them, and the plan's fixed rate when they cannot be read. Also runs
+        # when a save finishes, by which time the dashboard may be gone.
+        if not deadline_label.winfo_exists():
+            return
+        try:
+            deadline = session.estimated_deadline(goal)
+        except Exception as e:
+            diagnostics.log_exception("estimated_deadline", e, user=session.username)
+            from service import estimated_deadline
+            deadline = estimated_deadline(current_weight, goal_weight, goal_type)
         deadline_label.config(text=f"Estimated deadline: {deadline.strftime('%d %b, %Y')}")
     
     calculate_deadline()
     
-    def show_day_plan():
-        selected_date = calendar.get_date()
-        selected_day = datetime.strptime(selected_date, "%Y-%m-%d").strftime("%A")
-        muscle_group, exercises = muscle_workout_plan.get(selected_day, ("Rest", []))
-        
+    # The plan window and its widgets are built once and updated in place on
+    # later clicks; closing the window discards them
+    plan_view = {}
+    
+    def build_plan_window():
         plan_win = tk.Toplevel(root)
-        plan_win.title(f"Plan for {selected_date}")
         plan_win.geometry("500x600")
         plan_win.configure(bg="#1e1e1e")
         
-        tk.Label(plan_win, text=f"Plan for {selected_date}", 
-                font=("Segoe UI Black", 16), bg="#1e1e1e", fg="white").pack(pady=10)
+        title_label = tk.Label(plan_win, font=("Segoe UI Black", 16), bg="#1e1e1e", fg="white")
+        title_label.pack(pady=10)
         
         tk.Label(plan_win, text=f"Goal: {goal_type}", 
                 font=("Segoe UI", 12, "italic"), bg="#1e1e1e", fg="#74b9ff").pack()
@@ -417,61 +414,6 @@ def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
         tk.Label(plan_win, text="Are you a vegetarian?", 
                 font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=5)
         
-        def show_meal_plan(is_veg):
-            for widget in plan_win.winfo_children()[5:]:
-                widget.destroy()
-            
-            meal_plan = meal_plans[goal_type]["Vegetarian" if is_veg else "Non-Vegetarian"]
-            meal_data = []
-            
-            tk.Label(plan_win, text="\nMeal Plan:", 
-                    font=("Segoe UI", 12, "bold"), bg="#1e1e1e", fg="white").pack(anchor='w', padx=20)
-            
-            for meal_type, details in meal_plan.items():
-                meal_text = f"{meal_type}: {details['item']} ({details['calories']} cal, {details['protein']}g protein)"
-                tk.Label(plan_win, text=meal_text, 
-                        font=("Segoe UI", 12), bg="#1e1e1e", fg="#dfe6e9").pack(anchor='w', padx=20)
-                
-                meal_data.append({
-                    "Username": current_user,
-                    "Date": selected_date,
-                    "Meal Type": meal_type,
-                    "Food Item": details['item'],
-                    "Calories": details['calories'],
-                    "Protein (g)": details['protein'],
-                    "Vegetarian": is_veg
-                })
-            
-            if muscle_group != "Rest":
-                tk.Label(plan_win, text=f"\nWorkout: {muscle_group}", 
-                        font=("Segoe UI", 12, "bold"), bg="#1e1e1e", fg="white").pack(anchor='w', padx=20)
-                
-                workout_data = []
-                for exercise in exercises:
-                    tk.Label(plan_win, text=f"- {exercise}", 
-                            font=("Segoe UI", 12), bg="#1e1e1e", fg="#dfe6e9").pack(anchor='w', padx=40)
-                    
-                    workout_data.append({
-                        "Username": current_user,
-                        "Date": selected_date,
-                        "Muscle Group": muscle_group,
-                        "Exercise": exercise,
-                        "Sets": 3,
-                        "Reps": 10,
-                        "Duration (min)": 30 if "Cardio" in muscle_group else 0,
-                        "Completed": True
-                    })
-            
-            def save_and_close():
-                save_data(meal_data, FOOD_SHEET)
-                if muscle_group != "Rest":
-                    save_data(workout_data, WORKOUT_SHEET)
-                plan_win.destroy()
-            
-            tk.Button(plan_win, text="Mark as Done", 
-                     font=("Segoe UI Black", 12), bg="#0984e3", fg="white",
-                     command=save_and_close).pack(pady=20)
-        
         tk.Button(plan_win, text="Vegetarian", 
                  font=("Segoe UI", 12), bg="#00b894", fg="white",
                  command=lambda: show_meal_plan(True)).pack(pady=10)
@@ -479,6 +421,77 @@ def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
         tk.Button(plan_win, text="Non-Vegetarian", 
                  font=("Segoe UI", 12), bg="#d63031", fg="white",
                  command=lambda: show_meal_plan(False)).pack(pady=10)
+        
+        # Shown once a diet is picked
+        content = tk.Frame(plan_win, bg="#1e1e1e")
+        tk.Label(content, text="\nMeal Plan:", 
+                font=("Segoe UI", 12, "bold"), bg="#1e1e1e", fg="white").pack(anchor='w', padx=20)
+        meals_frame = tk.Frame(content, bg="#1e1e1e")
+        meals_frame.pack(fill='x')
+        workout_label = tk.Label(content, font=("Segoe UI", 12, "bold"), bg="#1e1e1e", fg="white")
+        exercises_frame = tk.Frame(content, bg="#1e1e1e")
+        done_button = tk.Button(content, text="Mark as Done", 
+                               font=("Segoe UI Black", 12), bg="#0984e3", fg="white",
+                               command=save_and_close)
+        done_button.pack(pady=20)
+        
+        plan_view.update(win=plan_win, title=title_label, content=content, meals_frame=meals_frame,
+                         meal_labels=[], workout_label=workout_label, exercises_frame=exercises_frame,
+                         exercise_labels=[], done_button=done_button)
+    
+    def set_lines(frame, labels, lines, padx):
+        # Reuses the frame's labels, creating more only when a plan has more lines
+        while len(labels) < len(lines):
+            labels.append(tk.Label(frame, font=("Segoe UI", 12), bg="#1e1e1e", fg="#dfe6e9"))
+        for label, line in zip(labels, lines):
+            label.config(text=line)
+            label.pack(anchor='w', padx=padx)
+        for label in labels[len(lines):]:
+            label.pack_forget()
+    
+    def show_day_plan():
+        selected_date = calendar.get_date()
+        
+        if not plan_view.get('win') or not plan_view['win'].winfo_exists():
+            build_plan_window()
+        plan_win = plan_view['win']
+        plan_view['date'] = selected_date
+        plan_win.title(f"Plan for {selected_date}")
+        plan_view['title'].config(text=f"Plan for {selected_date}")
+        plan_view['content'].pack_forget()
+        plan_win.deiconify()
+        plan_win.lift()
+    
+    def show_meal_plan(is_veg):
+        plan = session.day_plan(plan_view['date'], is_veg, goal)
+        plan_view['veg'] = is_veg
+        muscle_group = plan['muscle_group']
+        
+        set_lines(plan_view['meals_frame'], plan_view['meal_labels'], [
+            f"{meal_type}: {details['item']} ({details['calories']} cal, {details['protein']}g protein)"
+            for meal_type, details in plan['meal_plan'].items()
+        ], padx=20)
+        
+        workout_label = plan_view['workout_label']
+        exercises_frame = plan_view['exercises_frame']
+        if muscle_group != "Rest":
+            workout_label.config(text=f"\nWorkout: {muscle_group}")
+            workout_label.pack(anchor='w', padx=20, before=plan_view['done_button'])
+            exercises_frame.pack(fill='x', before=plan_view['done_button'])
+            set_lines(exercises_frame, plan_view['exercise_labels'],
+                      [f"- {exercise}" for exercise in plan['exercises']], padx=40)
+        else:
+            workout_label.pack_forget()
+            exercises_frame.pack_forget()
+        
+        plan_view['content'].pack(fill='x')
+    
+    def save_and_close():
+        commit_async(session.mark_day_done(plan_view['date'], plan_view['veg'], goal))
+        if 'index' in completion:
+            completion['index'].mark_done(plan_view['date'])
+        set_day_status(plan_view['date'], "completed")
+        plan_view['win'].withdraw()
     
     def log_weight():
         selected_date = calendar.get_date()
@@ -498,15 +511,8 @@ def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
         def save_weight():
             try:
                 weight = float(weight_entry.get())
-                weight_data = {
-                    "Username": current_user,
-                    "Date": selected_date,
-                    "Weight (kg)": weight,
-                    "Goal Type": goal_type,
-                    "Current Goal (kg)": goal_weight,
-                    "Active": True
-                }
-                save_data(weight_data, WEIGHT_SHEET)
+                commit_async(session.log_weight(weight, selected_date, goal),
+                             on_done=lambda result: calculate_deadline())
                 log_win.destroy()
             except ValueError:
                 tk.Label(log_win, text="Invalid number!", 
@@ -517,135 +523,101 @@ def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
                  command=save_weight).pack(pady=10)
     
     def show_reports():
+        # Reports must include anything still waiting in the write queue
+        writer.flush()
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from storage import WEIGHT_SHEET, NUTRITION_ROLLUP, WORKOUT_ROLLUP
+        import reports
+        
         try:
             report_win = tk.Toplevel(root)
             report_win.title("Fitness Reports")
             report_win.geometry("1000x700")
             report_win.configure(bg="#1e1e1e")
             
+            range_frame = tk.Frame(report_win, bg="#1e1e1e")
+            range_frame.pack(fill='x', padx=10, pady=(10, 0))
+            tk.Label(range_frame, text="Show:", font=("Segoe UI", 12), 
+                    bg="#1e1e1e", fg="white").pack(side=tk.LEFT)
+            range_var = tk.StringVar(value="All")
+            range_box = ttk.Combobox(range_frame, textvariable=range_var, values=list(reports.DATE_RANGES),
+                                     state="readonly", width=15)
+            range_box.pack(side=tk.LEFT, padx=5)
+            
             notebook = ttk.Notebook(report_win)
             notebook.pack(fill='both', expand=True, padx=10, pady=10)
             
-            # Weight Report
-            weight_frame = tk.Frame(notebook, bg="#1e1e1e")
-            notebook.add(weight_frame, text="Weight Progress")
+            # Each tab is rendered the first time it is selected
+            tabs = [
+                ("Weight Progress", "weight", WEIGHT_SHEET, reports.weight_figure),
+                ("Nutrition", "nutrition", NUTRITION_ROLLUP, reports.nutrition_figure),
+                ("Workouts", "workout", WORKOUT_ROLLUP, reports.workout_figure),
+            ]
+            tab_specs = {}
+            figures = []
+            for title, name, table, build_figure in tabs:
+                frame = tk.Frame(notebook, bg="#1e1e1e")
+                notebook.add(frame, text=title)
+                tab_specs[str(frame)] = (frame, name, table, build_figure)
+            pending = dict(tab_specs)
             
-            try:
-                df = pd.read_excel(DATA_FILE, sheet_name=WEIGHT_SHEET)
-                df = df[df['Username'] == current_user]
-                if not df.empty:
-                    df['Date'] = pd.to_datetime(df['Date'])
-                    df = df.sort_values('Date')
-                    
-                    fig, ax = plt.subplots(figsize=(8, 4))
-                    ax.plot(df['Date'], df['Weight (kg)'], marker='o', color="#0984e3", label='Weight')
-                    
-                    if 'Current Goal (kg)' in df.columns:
-                        goal_weight = df['Current Goal (kg)'].iloc[0]
-                        ax.axhline(y=goal_weight, color='r', linestyle='--', label='Goal Weight')
-                    
-                    ax.set_title("Weight Progress")
-                    ax.set_ylabel("Weight (kg)")
-                    ax.legend()
-                    ax.grid(True)
-                    
-                    canvas = FigureCanvasTkAgg(fig, master=weight_frame)
-                    canvas.draw()
-                    canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
-                else:
-                    tk.Label(weight_frame, text="No weight data available", 
+            def render_tab(event=None):
+                tab = pending.pop(notebook.select(), None)
+                if tab is None:
+                    return
+                frame, name, table, build_figure = tab
+                try:
+                    df = session.report_data(table)
+                    fig = None
+                    if not df.empty:
+                        fig = build_figure(df, days=reports.DATE_RANGES[range_var.get()])
+                    if fig is not None:
+                        figures.append(fig)
+                        canvas = FigureCanvasTkAgg(fig, master=frame)
+                        with diagnostics.span("report.draw", tab=name):
+                            canvas.draw()
+                        canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
+                    elif not df.empty:
+                        tk.Label(frame, text=f"No {name} data in this date range", 
+                                font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
+                    else:
+                        tk.Label(frame, text=f"No {name} data available", 
+                                font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
+                except Exception as e:
+                    diagnostics.log_exception("report.render", e, tab=name)
+                    tk.Label(frame, text=f"Error loading {name} data: {e}", 
                             font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
-            except Exception:
-                tk.Label(weight_frame, text="Error loading weight data", 
-                        font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
             
-            # Nutrition Report
-            nutrition_frame = tk.Frame(notebook, bg="#1e1e1e")
-            notebook.add(nutrition_frame, text="Nutrition")
+            def release_figures():
+                for fig in figures:
+                    fig.clear()
+                figures.clear()
             
-            try:
-                df = pd.read_excel(DATA_FILE, sheet_name=FOOD_SHEET)
-                df = df[df['Username'] == current_user]
-                if not df.empty:
-                    df['Date'] = pd.to_datetime(df['Date'])
-                    nutrition_df = df.groupby('Date').agg({
-                        'Calories': 'sum',
-                        'Protein (g)': 'sum'
-                    }).reset_index()
-                    nutrition_df = nutrition_df.sort_values('Date')
-                    
-                    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(8, 6))
-                    
-                    ax1.plot(nutrition_df['Date'], nutrition_df['Calories'], 
-                            marker='o', color="#00b894", label='Calories')
-                    ax1.set_title("Daily Calorie Intake")
-                    ax1.set_ylabel("Calories")
-                    ax1.legend()
-                    ax1.grid(True)
-                    
-                    ax2.plot(nutrition_df['Date'], nutrition_df['Protein (g)'], 
-                            marker='o', color="#6c5ce7", label='Protein')
-                    ax2.set_title("Daily Protein Intake")
-                    ax2.set_ylabel("Protein (g)")
-                    ax2.legend()
-                    ax2.grid(True)
-                    
-                    plt.tight_layout()
-                    
-                    canvas = FigureCanvasTkAgg(fig, master=nutrition_frame)
-                    canvas.draw()
-                    canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
-                else:
-                    tk.Label(nutrition_frame, text="No nutrition data available", 
-                            font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
-            except Exception:
-                tk.Label(nutrition_frame, text="Error loading nutrition data", 
-                        font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
+            def change_range(event=None):
+                # Re-render the visible tab now and the others when next selected
+                release_figures()
+                for frame, *_ in tab_specs.values():
+                    for widget in frame.winfo_children():
+                        widget.destroy()
+                pending.update(tab_specs)
+                render_tab()
             
-            # Workout Report
-            workout_frame = tk.Frame(notebook, bg="#1e1e1e")
-            notebook.add(workout_frame, text="Workouts")
-            
-            try:
-                df = pd.read_excel(DATA_FILE, sheet_name=WORKOUT_SHEET)
-                df = df[df['Username'] == current_user]
-                if not df.empty:
-                    df['Date'] = pd.to_datetime(df['Date'])
-                    workout_summary = df.groupby(['Date', 'Muscle Group']).size().unstack(fill_value=0)
-                    
-                    fig, ax = plt.subplots(figsize=(8, 4))
-                    workout_summary.plot(kind='bar', stacked=True, ax=ax)
-                    ax.set_title("Workout Frequency by Muscle Group")
-                    ax.set_ylabel("Number of Exercises")
-                    ax.legend(title="Muscle Group")
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    
-                    canvas = FigureCanvasTkAgg(fig, master=workout_frame)
-                    canvas.draw()
-                    canvas.get_tk_widget().pack(fill='both', expand=True, padx=10, pady=10)
-                else:
-                    tk.Label(workout_frame, text="No workout data available", 
-                            font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
-            except Exception:
-                tk.Label(workout_frame, text="Error loading workout data", 
-                        font=("Segoe UI", 12), bg="#1e1e1e", fg="white").pack(pady=50)
+            notebook.bind("<<NotebookTabChanged>>", render_tab)
+            range_box.bind("<<ComboboxSelected>>", change_range)
+            report_win.bind("<Destroy>", lambda event: release_figures() if event.widget is report_win else None)
+            render_tab()
             
         except Exception as e:
+            diagnostics.log_exception("report.open", e)
             messagebox.showerror("Error", f"Could not generate reports: {str(e)}")
     
     def complete_goal():
-        # Mark the current goal as inactive
-        try:
-            df = pd.read_excel(DATA_FILE, sheet_name=WEIGHT_SHEET)
-            df.loc[(df['Username'] == current_user) & (df['Active'] == True), 'Active'] = False
-            with pd.ExcelWriter(DATA_FILE, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                df.to_excel(writer, sheet_name=WEIGHT_SHEET, index=False)
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not complete goal: {str(e)}")
+        # Clear the active goal record; the weight history is left untouched
+        commit_async(session.complete_goal(goal),
+                     on_error=lambda e: messagebox.showerror("Error", f"Could not complete goal: {str(e)}"))
         
         # Return to goal selection
-        show_goal_window(root)
+        show_goal_window(root, session)
     
     tk.Button(button_frame, text="Show Plan", 
              font=("Segoe UI Black", 12), bg="#0984e3", fg="white",
@@ -665,6 +637,12 @@ def show_calendar_dashboard(root, current_weight, goal_weight, goal_type):
 
 # --- Main Application ---
 if __name__ == "__main__":
+    atexit.register(writer.close)
     root = tk.Tk()
     app = AuthWindow(root)
+    # The login window is up; open the data layer while credentials are typed
+    root.after_idle(prewarm, get_service, "tkcalendar")
     root.mainloop()
+    writer.close()
+    if _service is not None:
+        _service.storage.close()  # compacts the write-ahead journal
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+from plans import PlanTable, WEEKDAYS, muscle_workout_plan
+from storage import USERS_SHEET, WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET, concat_frames
+
+# --- Analytics ---
+# Progress statistics computed with whole-column NumPy/pandas operations over
+# frames holding any number of users (a Username column), so the same code
+# serves one user's dashboard and the nightly pass over every user:
+#
+#   rolling_weight      rolling-average weight per log entry
+#   weight_trends       least-squares linear or exponential trend of recent
+#                       weights and the date it reaches the goal weight
+#   workout_streaks     current and longest run of consecutive workout days
+#                       (plan rest days do not break a run)
+#   calorie_adherence   logged calories against the meal plan's daily target
+#   summarize           all of the above, one row per user
+
+ROLLING_DAYS = 7
+TREND_DAYS = 28  # weights older than this (before a user's latest log) are not fitted
+MIN_TREND_POINTS = 5  # fewer recent weigh-ins than this are not worth a trend
+MAX_ETA_DAYS = 5 * 365
+ADHERENCE_TOLERANCE = 0.1  # within +/-10% of the target counts as on plan
+TREND_METHODS = ("linear", "exponential")
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _dated(df, columns):
+    df = df[columns].copy()
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.sort_values(['Username', 'Date'], kind='stable').reset_index(drop=True)
+
+
+def rolling_weight(weights, days=ROLLING_DAYS):
+    df = _dated(weights, ['Username', 'Date', 'Weight (kg)'])
+    rolling = df.set_index('Date').groupby('Username', sort=True, observed=True)['Weight (kg)'].rolling(f"{days}D").mean()
+    df['Rolling (kg)'] = rolling.to_numpy()
+    return df
+
+
+def weight_trends(weights, goals, method="linear", trend_days=TREND_DAYS):
+    # goals: frame with Username and Current Goal (kg). Returns one row per
+    # user with the fitted weekly change and the ETA (NaT when the trend never
+    # reaches the goal, e.g. it is moving away from it, or is too flat)
+    if method not in TREND_METHODS:
+        raise ValueError(f"Unknown trend method: {method}")
+    df = _dated(weights, ['Username', 'Date', 'Weight (kg)']).dropna()
+    last = df.groupby('Username')['Date'].transform('max')
+    df = df[df['Date'] > last - pd.Timedelta(days=trend_days)]
+
+    # Days relative to each user's latest log keep the sums well conditioned
+    t = (df['Date'] - last[df.index]).dt.days.astype(float)
+    y = df['Weight (kg)'] if method == "linear" else np.log(df['Weight (kg)'])
+    sums = pd.DataFrame({'Username': df['Username'], 'n': 1.0, 't': t, 'y': y, 'tt': t * t, 'ty': t * y})
+    sums = sums.groupby('Username', observed=True).sum()
+    denominator = sums['n'] * sums['tt'] - sums['t'] ** 2
+    slope = (sums['n'] * sums['ty'] - sums['t'] * sums['y']) / denominator.where(denominator > 0)
+    intercept = (sums['y'] - slope * sums['t']) / sums['n']
+
+    trends = pd.DataFrame({'Points': sums['n'].astype(int)})
+    trends['Last Date'] = df.groupby('Username', observed=True)['Date'].max()
+    goal = goals.set_index('Username')['Current Goal (kg)'].reindex(trends.index).astype(float)
+    if method == "linear":
+        trends['Trend (kg)'] = intercept
+        trends['Trend (kg/week)'] = slope * 7
+        days_to_goal = (goal - intercept) / slope
+    else:
+        trends['Trend (kg)'] = np.exp(intercept)
+        trends['Trend (kg/week)'] = np.exp(intercept) * np.expm1(slope * 7)
+        days_to_goal = (np.log(goal) - intercept) / slope
+    reachable = (days_to_goal >= 0) & (days_to_goal <= MAX_ETA_DAYS)
+    trends['ETA'] = trends['Last Date'] + pd.to_timedelta(days_to_goal.where(reachable).round(), unit='D')
+    return trends.reset_index()
+
+
+def _weekmask(rest_days):
+    return "".join("0" if weekday in rest_days else "1" for weekday in range(7))
+
+
+def plan_rest_days(workouts=muscle_workout_plan):
+    return {WEEKDAYS.index(day) for day, (group, _) in workouts.items() if group == "Rest"}
+
+
+def workout_streaks(workouts, rest_days=None, today=None):
+    # Days are numbered by np.busday_count over the plan's workout weekdays, so
+    # consecutive workout days differ by exactly 1 even across a rest day
+    weekmask = _weekmask(plan_rest_days() if rest_days is None else rest_days)
+    done = workouts.loc[workouts['Completed'].astype(bool), ['Username', 'Date']]
+    done = _dated(done.drop_duplicates(), ['Username', 'Date'])
+    done['Day'] = np.busday_count(_EPOCH, done['Date'].to_numpy().astype('datetime64[D]'), weekmask=weekmask)
+    done = done.drop_duplicates(['Username', 'Day'])
+
+    new_run = done.groupby('Username')['Day'].diff() != 1
+    done['Run'] = new_run.cumsum()
+    runs = done.groupby(['Username', 'Run'], observed=True).agg(Length=('Day', 'size'), End=('Day', 'max')).reset_index()
+    streaks = runs.groupby('Username', observed=True).agg(**{'Longest streak': ('Length', 'max')})
+    latest = runs.groupby('Username').tail(1).set_index('Username')
+
+    today = np.datetime64(pd.Timestamp(today or pd.Timestamp.today()).date(), 'D')
+    today_day = np.busday_count(_EPOCH, today, weekmask=weekmask)
+    # A run is still going if it reached the previous workout day (today may
+    # not be logged yet)
+    alive = latest['End'] >= today_day - 1
+    streaks['Current streak'] = latest['Length'].where(alive, 0)
+    streaks['Last workout'] = done.groupby('Username', observed=True)['Date'].max()
+    return streaks.reset_index()
+
+
+def calorie_targets(goals, plans=None):
+    # Daily calorie target per (Username, Vegetarian) from each user's plan;
+    # meal plans do not vary by weekday
+    plans = plans or PlanTable()
+    rows = [(username, vegetarian, sum(row['Calories'] for row in
+                                       plans.lookup(0, goal_type, vegetarian, username)['meal_rows']))
+            for username, goal_type in zip(goals['Username'], goals['Goal Type'])
+            for vegetarian in (True, False)]
+    return pd.DataFrame(rows, columns=['Username', 'Vegetarian', 'Target (kcal)'])
+
+
+def calorie_adherence(food, goals, plans=None, tolerance=ADHERENCE_TOLERANCE):
+    # Returns (per-day frame, per-user summary)
+    daily = food.groupby(['Username', 'Date'], as_index=False, observed=True).agg(
+        **{'Calories': ('Calories', 'sum'), 'Vegetarian': ('Vegetarian', 'any')})
+    daily = daily.merge(calorie_targets(goals, plans), on=['Username', 'Vegetarian'], how='inner')
+    daily['Ratio'] = daily['Calories'] / daily['Target (kcal)']
+    daily['On plan'] = (daily['Ratio'] - 1).abs() <= tolerance
+    summary = daily.groupby('Username', observed=True).agg(**{
+        'Logged days': ('Date', 'size'),
+        'Adherence (%)': ('On plan', 'mean'),
+        'Mean calories ratio': ('Ratio', 'mean'),
+    })
+    summary['Adherence (%)'] *= 100
+    return daily, summary.reset_index()
+
+
+def summarize(storage, usernames=None, plans=None, today=None, trend_days=TREND_DAYS):
+    # One row per user with an active goal. Every sheet is read once (all users
+    # at a time for the nightly pass) and each statistic is one vectorised pass.
+    def read(sheet_name):
+        if usernames is None:
+            return storage.read(sheet_name)
+        return concat_frames(sheet_name, [storage.read(sheet_name, username=name) for name in usernames])
+
+    names = read(USERS_SHEET)['Username'] if usernames is None else usernames
+    goals = pd.DataFrame([goal for goal in (storage.get_goal(name) for name in names) if goal],
+                         columns=['Username', 'Date', 'Weight (kg)', 'Goal Type', 'Current Goal (kg)'])
+    summary = goals.rename(columns={'Date': 'Goal Start', 'Weight (kg)': 'Start (kg)'})
+    if goals.empty:
+        return summary
+
+    weights = read(WEIGHT_SHEET)
+    weights = weights[weights['Username'].isin(goals['Username'])]
+    latest = rolling_weight(weights).groupby('Username').tail(1)
+    summary = summary.merge(latest.rename(columns={'Date': 'Last Weigh-in', 'Weight (kg)': 'Latest (kg)'}),
+                            on='Username', how='left')
+    # Trends are fitted to the weights logged since each user's goal started,
+    # and only reported with at least MIN_TREND_POINTS of them, as on the
+    # dashboard
+    start = pd.to_datetime(weights['Username'].astype(object).map(goals.set_index('Username')['Date']))
+    goal_weights = weights[start.isna() | (weights['Date'] >= start)]
+    for method in TREND_METHODS:
+        trend = weight_trends(goal_weights, goals, method, trend_days)
+        trend[['ETA', 'Trend (kg/week)']] = trend[['ETA', 'Trend (kg/week)']].where(
+            trend['Points'] >= MIN_TREND_POINTS)
+        columns = {'ETA': f"{method.capitalize()} ETA"}
+        if method == "linear":
+            columns['Trend (kg/week)'] = 'Trend (kg/week)'
+        summary = summary.merge(trend[['Username'] + list(columns)].rename(columns=columns),
+                                on='Username', how='left')
+    summary = summary.merge(workout_streaks(read(WORKOUT_SHEET), today=today), on='Username', how='left')
+    summary = summary.merge(calorie_adherence(read(FOOD_SHEET), goals, plans)[1], on='Username', how='left')
+    return summary
@@ -0,0 +1,122 @@
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+
+import reports
+from diagnostics import log_exception, span
+from storage import USERS_SHEET, WEIGHT_SHEET, NUTRITION_ROLLUP, WORKOUT_ROLLUP, open_storage
+
+# --- Batch report rendering ---
+# Renders the app's report charts (the same reports.py figures the "View
+# Reports" window shows) for many users without a display: every user is one
+# task on a ProcessPoolExecutor, so drawing, which is CPU bound, uses every
+# core. Each worker process opens its own storage connection once and draws
+# with the Agg canvas. Per user it writes one PNG per chart and/or one PDF with
+# a page per chart; users without data for a chart just get no file for it.
+
+REPORT_FIGURES = [
+    ("weight", WEIGHT_SHEET, reports.weight_figure),
+    ("nutrition", NUTRITION_ROLLUP, reports.nutrition_figure),
+    ("workouts", WORKOUT_ROLLUP, reports.workout_figure),
+]
+FORMATS = ("png", "pdf")
+DPI = 100
+
+_storage = None  # the worker process's storage, opened by _init_worker
+
+
+def _init_worker(backend, path):
+    global _storage
+    _storage = open_storage(backend, cache=False, journal=False, **({"path": path} if path else {}))
+
+
+def _file_name(username):
+    # Names that had to be changed, or that a case-insensitive file system
+    # could confuse, get a checksum of the real name: "a b" and "a_b", or
+    # "Bob" and "bob", never share files ("~" is never kept from a name)
+    safe = re.sub(r"[^\w.-]", "_", username)
+    return safe if safe == username.lower() else f"{safe}~{zlib.crc32(username.encode()):08x}"
+
+
+def render_user(username, out_dir, formats=FORMATS, days=None, dpi=DPI):
+    # Runs in a worker process; returns the paths written. Files are written
+    # under a temporary name and renamed, so a crash never leaves a truncated
+    # chart behind.
+    base = os.path.join(out_dir, _file_name(username))
+    written = []
+    figures = []
+    with span("report.render_user", user=username):
+        for name, table, build_figure in REPORT_FIGURES:
+            df = _storage.read(table, username=username)
+            fig = build_figure(df, days=days) if not df.empty else None
+            if fig is None:
+                continue
+            FigureCanvasAgg(fig)
+            figures.append(fig)
+            if "png" in formats:
+                fig.savefig(f"{base}_{name}.tmp.png", dpi=dpi)
+                os.replace(f"{base}_{name}.tmp.png", f"{base}_{name}.png")
+                written.append(f"{base}_{name}.png")
+        if "pdf" in formats and figures:
+            with PdfPages(f"{base}.tmp.pdf") as pdf:
+                for fig in figures:
+                    pdf.savefig(fig)
+            os.replace(f"{base}.tmp.pdf", f"{base}.pdf")
+            written.append(f"{base}.pdf")
+        for fig in figures:
+            fig.clear()
+    return written
+
+
+def render_reports(backend, path, out_dir, usernames=None, formats=FORMATS, days=None, processes=None,
+                   dpi=DPI):
+    # Returns stats: users, files, failed ({username: error}) and the total
+    # wall time. processes=1 renders in this process, without a pool.
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown report format: {', '.join(sorted(unknown))}")
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    if usernames is None:
+        storage = open_storage(backend, cache=False, journal=False, **({"path": path} if path else {}))
+        try:
+            usernames = [name for users in storage.iter_read(USERS_SHEET) for name in users['Username']]
+        finally:
+            storage.close()
+
+    files = {}
+    for username in usernames:
+        other = files.setdefault(_file_name(username).casefold(), username)
+        if other != username:
+            raise ValueError(f"Users {other!r} and {username!r} would share report files")
+
+    stats = {"users": len(usernames), "files": 0, "failed": {}}
+    if processes == 1:
+        _init_worker(backend, path)
+        try:
+            for username in usernames:
+                try:
+                    stats["files"] += len(render_user(username, out_dir, formats, days, dpi))
+                except Exception as e:
+                    log_exception("report.render_user", e, user=username)
+                    stats["failed"][username] = f"{type(e).__name__}: {e}"
+        finally:
+            _storage.close()
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(backend, path)) as pool:
+            tasks = {pool.submit(render_user, username, out_dir, formats, days, dpi): username
+                     for username in usernames}
+            for task in as_completed(tasks):
+                try:
+                    stats["files"] += len(task.result())
+                except Exception as e:
+                    log_exception("report.render_user", e, user=tasks[task])
+                    stats["failed"][tasks[task]] = f"{type(e).__name__}: {e}"
+    stats["seconds"] = time.perf_counter() - started
+    return stats
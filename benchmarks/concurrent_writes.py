@@ -0,0 +1,83 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Concurrent writer benchmark: N processes, each acting as one user's tracker
+# instance, commit a day's meals and workouts K times against the same storage
+# location. Reports total commits/s for the single-file and sharded backends,
+# i.e. how write throughput scales with the number of concurrent users.
+#
+#     python benchmarks/concurrent_writes.py [--writers 1 2 4 8] [--commits 200]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from service import TrackerService  # noqa: E402
+from storage import open_storage  # noqa: E402
+
+
+def location(workdir, backend):
+    return os.path.join(workdir, "bench.db" if backend == "sqlite" else "bench_shards")
+
+
+def writer(backend, path, username, commits, start):
+    service = TrackerService(open_storage(backend, cache=False, path=path))
+    session = service.session(username)
+    start.wait()
+    day = date(2020, 1, 1)
+    for i in range(commits):
+        session.commit(session.mark_day_done((day + timedelta(days=i)).strftime('%Y-%m-%d'), i % 2 == 0))
+    service.storage.close()
+
+
+def run(backend, workdir, writers, commits):
+    path = location(workdir, backend)
+    service = TrackerService(open_storage(backend, cache=False, path=path))
+    service.storage.initialize(workbook=None)
+    usernames = [f"bench{writers}_{i}" for i in range(writers)]
+    for username in usernames:
+        service.register(username, "x")
+        session = service.session(username)
+        session.commit(session.start_goal("Weight Loss", 80, 70))
+    service.storage.close()
+
+    start = multiprocessing.Event()
+    processes = [multiprocessing.Process(target=writer, args=(backend, path, username, commits, start))
+                 for username in usernames]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)  # let every process import and open its connection
+    began = time.perf_counter()
+    start.set()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - began
+    if any(process.exitcode for process in processes):
+        raise RuntimeError(f"a {backend} writer failed")
+    return writers * commits / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent writer throughput per storage backend")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--commits", type=int, default=200, help="commits per writer")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="fitness_bench_")
+    try:
+        print(f"{'writers':>8} {'sqlite':>14} {'sharded':>14}")
+        for writers in args.writers:
+            rates = [run(backend, workdir, writers, args.commits) for backend in ("sqlite", "sharded")]
+            print(f"{writers:>8} " + " ".join(f"{rate:>9.0f} c/s" for rate in rates))
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+# Write-ahead journal check and benchmark.
+#
+# Crash rounds: a child process saves weigh-ins from several threads through
+# the journaled storage and prints each one once its commit has returned; the
+# parent kills it (SIGKILL / TerminateProcess) at a random moment mid-save,
+# reopens the storage, which replays the journal, and checks that every
+# acknowledged save and every journal record newer than the database's
+# recorded position is there. Every other round simulates a power loss: the
+# child runs without WAL auto-checkpoints and the parent deletes the WAL after
+# the kill, so everything since the last checkpoint must come back from the
+# journal. With FITNESS_TRACKER_JOURNAL=0 those rounds lose saves.
+#
+# Throughput: commits/s from the same threads with the journal (SQLite
+# synchronous=NORMAL plus one group fsync per batch of concurrent commits),
+# with synchronous=FULL (an fsync per transaction) and with NORMAL alone (no
+# durability on power loss).
+#
+#     python benchmarks/crash_recovery.py [--rounds 10] [--threads 4] [--seconds 3]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from journal import JOURNAL_SUFFIX, read_records  # noqa: E402
+from service import TrackerService  # noqa: E402
+from storage import JOURNAL, WEIGHT_SHEET, SqliteStorage, open_storage  # noqa: E402
+
+START = date(2024, 1, 1)
+USER = "crash"
+
+
+def day(thread, i, threads):
+    return (START + timedelta(days=i * threads + thread)).isoformat()
+
+
+def open_service(path, journal=JOURNAL, synchronous=None, autocheckpoint=True):
+    service = TrackerService(open_storage(path=path, journal=journal))
+    service.storage.initialize(workbook=None)
+    backend = service.storage.backend.backend if journal else service.storage.backend
+    if synchronous:
+        backend.connect().execute(f"PRAGMA synchronous={synchronous}")
+    if not autocheckpoint:
+        backend.connect().execute("PRAGMA wal_autocheckpoint=0")
+    return service
+
+
+def save_loop(service, thread, threads, until, on_saved, base=80):
+    session = service.session(USER)
+    i = 0
+    while until():
+        weight = round(base - 0.01 * i, 2)
+        session.commit(session.log_weight(weight, day(thread, i, threads)))
+        on_saved(thread, i, weight)
+        i += 1
+
+
+def child(path, threads, power_loss, base):
+    service = open_service(path, autocheckpoint=not power_loss)
+    lock = threading.Lock()
+
+    def acknowledge(thread, i, weight):
+        with lock:
+            print(f"{thread} {i} {weight}", flush=True)
+
+    workers = [threading.Thread(target=save_loop, args=(service, t, threads, lambda: True, acknowledge, base))
+               for t in range(threads)]
+    print("ready", flush=True)
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def crash_round(path, threads, rng, base, power_loss=False):
+    # Each round saves its own weights (base), so saves that an earlier round
+    # made on the same days cannot stand in for lost ones
+    command = [sys.executable, os.path.abspath(__file__), "--child", path, "--threads", str(threads),
+               "--base", str(base)]
+    proc = subprocess.Popen(command + (["--power-loss"] if power_loss else []), stdout=subprocess.PIPE, text=True)
+    if proc.stdout.readline().strip() != "ready":
+        raise RuntimeError("child did not start")
+    acked = []
+    reader = threading.Thread(target=lambda: acked.extend(line.split() for line in proc.stdout))
+    reader.start()
+    time.sleep(rng.uniform(0.2, 1.0))
+    proc.kill()
+    proc.wait()
+    reader.join()
+    if power_loss:
+        # Commits since the last checkpoint were only in the WAL
+        for suffix in ("-wal", "-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path + suffix)
+
+    # What the journal holds beyond the database's position, read before
+    # recovery replays it
+    raw = SqliteStorage(path)
+    position = raw.journal_position(os.path.basename(path) + JOURNAL_SUFFIX)
+    raw.close()
+    pending = [batch for seq, batch in read_records(path + JOURNAL_SUFFIX)[0] if seq > position]
+
+    storage = open_storage(path=path)
+    started = time.perf_counter()
+    storage.initialize(workbook=None)
+    recovery = time.perf_counter() - started
+    weights = storage.read(WEIGHT_SHEET, username=USER)
+    stored = dict(zip(weights['Date'].dt.strftime('%Y-%m-%d'), weights['Weight (kg)']))
+    lost = [(t, i) for t, i, w in (line for line in acked if len(line) == 3)
+            if stored.get(day(int(t), int(i), threads)) != float(w)]
+    unapplied = [batch for batch in pending
+                 if any(stored.get(row["Date"]) != row["Weight (kg)"]
+                        for op, args in batch.operations if op == "upsert" and args[0] == WEIGHT_SHEET
+                        for row in args[1])]
+    storage.close()
+    return len(acked), len(pending), lost, unapplied, recovery
+
+
+def throughput(workdir, mode, threads, seconds):
+    path = os.path.join(workdir, f"throughput_{mode}.db")
+    service = open_service(path, journal=mode == "journal", synchronous={"full": "FULL"}.get(mode))
+    service.register(USER, "password")
+    session = service.session(USER)
+    session.commit(session.start_goal("Weight Loss", 80, 70, START.isoformat()))
+    deadline = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def count(thread, i, weight):
+        counts[thread] += 1
+
+    workers = [threading.Thread(target=save_loop,
+                                args=(service, t, threads, lambda: time.perf_counter() < deadline, count))
+               for t in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    service.storage.close()
+    return sum(counts) / seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kill writers mid-save and check the journal recovers them")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3, help="length of each throughput run")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--power-loss", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base", type=float, default=80, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(args.child, args.threads, args.power_loss, args.base)
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="fitness_crash_")
+    try:
+        path = os.path.join(workdir, "crash.db")
+        service = open_service(path)
+        service.register(USER, "password")
+        session = service.session(USER)
+        session.commit(session.start_goal("Weight Loss", 80, 70, START.isoformat()))
+        service.storage.close()
+
+        rng = random.Random(0)
+        failures = 0
+        recoveries = []
+        print(f"{'round':>5} {'crash':>10} {'acked':>7} {'replayed':>9} {'lost':>5} {'unapplied':>10} {'recovery':>10}")
+        for round_number in range(1, args.rounds + 1):
+            power_loss = round_number % 2 == 0
+            acked, replayed, lost, unapplied, recovery = crash_round(path, args.threads, rng, 80 + round_number,
+                                                                    power_loss)
+            recoveries.append(recovery)
+            failures += bool(lost or unapplied)
+            print(f"{round_number:>5} {'power loss' if power_loss else 'kill':>10} {acked:>7} {replayed:>9} "
+                  f"{len(lost):>5} {len(unapplied):>10} {recovery * 1000:>7.1f} ms")
+        print(f"{'OK' if not failures else 'FAILED'}: {failures} of {args.rounds} rounds lost acknowledged saves "
+              f"or journal records; median recovery {statistics.median(recoveries) * 1000:.1f} ms")
+
+        print(f"\ncommits/s with {args.threads} threads:")
+        for mode, label in (("journal", "journal + synchronous=NORMAL"), ("full", "synchronous=FULL"),
+                            ("normal", "synchronous=NORMAL, no journal (not durable)")):
+            print(f"  {label:<46} {throughput(workdir, mode, args.threads, args.seconds):>8.0f}")
+    finally:
+        shutil.rmtree(workdir)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
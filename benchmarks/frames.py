@@ -0,0 +1,81 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Frame dtype benchmark: generates the suite's synthetic dataset, then builds
+# every sheet twice from the same database rows, once with the plain dtypes
+# pandas infers (object strings, int64) and once with the compact dtypes
+# storage gives its frames (categoricals, datetime64, small ints), and compares
+# their memory (memory_usage(deep=True)) and the time of the groupbys the
+# reports and analytics run on them.
+#
+#     python benchmarks/frames.py [--users 100] [--days 365] [--repeat 20]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+from storage import (WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET, BOOL_COLUMNS, compact,  # noqa: E402
+                     open_storage, sheet_columns, _quote)
+from suite import generate  # noqa: E402
+
+GROUPBYS = {
+    WEIGHT_SHEET: lambda df: df.groupby(['Username', 'Date'], observed=True)['Weight (kg)'].mean(),
+    FOOD_SHEET: lambda df: df.groupby(['Username', 'Date'], observed=True)[['Calories', 'Protein (g)']].sum(),
+    WORKOUT_SHEET: lambda df: df.groupby(['Username', 'Date', 'Muscle Group'], observed=True).size(),
+}
+
+
+def plain_frame(sheet_name, rows):
+    df = pd.DataFrame.from_records(rows, columns=sheet_columns(sheet_name))
+    for column in BOOL_COLUMNS.intersection(df.columns):
+        df[column] = df[column].astype(bool)
+    return df
+
+
+def timing(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory and groupby time of plain vs compact frame dtypes")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=20, help="timed groupbys per sheet")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="fitness_frames_")
+    try:
+        storage = open_storage(path=os.path.join(workdir, "frames.db"), cache=False)
+        storage.initialize(workbook=None)
+        generate(storage, args.users, args.days)
+        print(f"{args.users} users x {args.days} days")
+        print(f"  {'sheet':<8} {'rows':>9} {'plain':>10} {'compact':>10} {'saved':>6}"
+              f" {'plain groupby':>14} {'compact groupby':>16}")
+        for sheet_name, groupby in GROUPBYS.items():
+            columns = ", ".join(_quote(c) for c in sheet_columns(sheet_name))
+            rows = storage.connect().execute(f"SELECT {columns} FROM {_quote(sheet_name)}").fetchall()
+            plain = plain_frame(sheet_name, rows)
+            compacted = compact(sheet_name, plain_frame(sheet_name, rows))
+            sizes = [df.memory_usage(deep=True).sum() / 2 ** 20 for df in (plain, compacted)]
+            times = [timing(lambda: groupby(df), args.repeat) for df in (plain, compacted)]
+            print(f"  {sheet_name:<8} {len(rows):>9} {sizes[0]:>7.1f} MB {sizes[1]:>7.1f} MB "
+                  f"{1 - sizes[1] / sizes[0]:>5.0%} {times[0]:>11.1f} ms {times[1]:>13.1f} ms")
+        storage.close()
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
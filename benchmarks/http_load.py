@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+# HTTP API load test: generates the suite's synthetic dataset, starts
+# `cli.py serve` on it in a separate process, then runs concurrent clients that
+# each log in once and send a mix of API requests over one kept-alive
+# connection. Reports requests/s overall and latency percentiles per route.
+#
+#     python benchmarks/http_load.py [--users 20] [--days 90] [--clients 16] [--seconds 10] [--workers 8]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import open_storage  # noqa: E402
+from suite import PASSWORD, START, generate  # noqa: E402
+
+# (route label, weight) of the request mix
+MIX = [("GET /goal", 4), ("GET /plan", 4), ("GET /reports/weight", 2), ("POST /weight", 1), ("POST /done", 1)]
+
+
+class Client:
+    # Minimal HTTP/1.1 JSON client keeping one connection open
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.token = None
+        self._reader = self._writer = None
+
+    async def request(self, method, path, body=None):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(payload)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self._writer.write((head + "\r\n").encode("latin-1") + payload)
+        await self._writer.drain()
+        status_line, *header_lines = (await self._reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = dict(line.lower().split(": ", 1) for line in header_lines if ": " in line)
+        data = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection") == "close":
+            await self.close()
+        return int(status_line.split(" ")[1]), json.loads(data) if data else None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+async def run_client(host, port, username, deadline, latencies, errors, rng):
+    client = Client(host, port)
+    status, data = await client.request("POST", "/login", {"username": username, "password": PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"login failed for {username}: {data}")
+    client.token = data["token"]
+    routes, weights = zip(*MIX)
+    while time.perf_counter() < deadline:
+        route = rng.choices(routes, weights)[0]
+        day = (START + timedelta(days=rng.randrange(365))).isoformat()
+        method, path = route.split(" ")
+        body = None
+        if route == "GET /plan":
+            path += f"?date={day}&vegetarian={rng.randrange(2)}"
+        elif route == "GET /reports/weight":
+            path += "?range=all"
+        elif route == "POST /weight":
+            body = {"weight": round(rng.uniform(60, 90), 1), "date": day}
+        elif route == "POST /done":
+            body = {"date": day, "vegetarian": bool(rng.randrange(2))}
+        started = time.perf_counter()
+        status, _ = await client.request(method, path, body)
+        latencies.setdefault(route, []).append(time.perf_counter() - started)
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+    await client.close()
+
+
+async def load(host, port, users, clients, seconds):
+    latencies, errors = {}, {}
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, f"user{i % users}", deadline, latencies, errors,
+                                      random.Random(i)) for i in range(clients)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API throughput and latency")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent connections")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=8, help="server worker threads")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="fitness_http_")
+    server = None
+    try:
+        path = os.path.join(workdir, "http.db")
+        storage = open_storage(path=path)
+        storage.initialize(workbook=None)
+        generate(storage, args.users, args.days)
+        storage.close()
+
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "cli.py"), "--db", path, "serve",
+                                   "--port", "0", "--workers", str(args.workers)],
+                                  stdout=subprocess.PIPE, text=True)
+        line = server.stdout.readline()
+        if not line.startswith("Listening on http://"):
+            raise RuntimeError(f"server did not start: {line!r}")
+        host, port = line.split("http://", 1)[1].split(" ", 1)[0].rsplit(":", 1)
+
+        seconds, latencies, errors = asyncio.run(load(host, int(port), args.users, args.clients, args.seconds))
+        total = sum(len(samples) for samples in latencies.values())
+        print(f"{args.clients} clients, {args.workers} workers, {args.users} users x {args.days} days: "
+              f"{total} requests in {seconds:.1f}s = {total / seconds:.0f} requests/s")
+        print(f"  {'route':<22} {'count':>7} {'p50':>9} {'p95':>9} {'max':>9}")
+        for route, samples in sorted(latencies.items()):
+            samples.sort()
+            print(f"  {route:<22} {len(samples):>7} {statistics.median(samples) * 1000:>6.1f} ms "
+                  f"{percentile(samples, 0.95) * 1000:>6.1f} ms {samples[-1] * 1000:>6.1f} ms")
+        if errors:
+            print(f"  errors: {errors}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
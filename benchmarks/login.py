@@ -0,0 +1,76 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Login benchmark: fills a fresh database with N users and times
+# TrackerService.authenticate for the first login (which loads the Users
+# index) and for later logins, for growing N. Later logins should cost one
+# dict lookup plus one KDF call whatever the size of the Users sheet, so their
+# latency stays flat while only the one-off index load grows with N.
+#
+#     python benchmarks/login.py [--users 100 1000 10000 100000] [--logins 20]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from passwords import hash_password  # noqa: E402
+from service import TrackerService  # noqa: E402
+from storage import USERS_SHEET, Batch, open_storage  # noqa: E402
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def run(workdir, users, logins):
+    path = os.path.join(workdir, f"login_{users}.db")
+    service = TrackerService(open_storage(path=path))
+    service.storage.initialize(workbook=None)
+    # One real hash reused for every row keeps setup fast; the salt being
+    # shared does not change what a login costs
+    password_hash = hash_password("password")
+    service.storage.commit(Batch().upsert(USERS_SHEET, [
+        {"Username": f"user{i}", "PasswordHash": password_hash} for i in range(users)]))
+    service.storage.close()
+
+    service = TrackerService(open_storage(path=path))
+    started = time.perf_counter()
+    assert service.authenticate("user0", "password") is not None
+    first = time.perf_counter() - started
+
+    samples = []
+    for i in range(logins):
+        username = f"user{(i * 7919) % users}"
+        started = time.perf_counter()
+        assert service.authenticate(username, "password") is not None
+        samples.append(time.perf_counter() - started)
+    service.storage.close()
+    return first, samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Login latency as the Users sheet grows")
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--logins", type=int, default=20, help="timed logins per size")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="fitness_login_")
+    try:
+        print(f"{'users':>8} {'first login':>12} {'p50':>9} {'p95':>9} {'max':>9}")
+        for users in args.users:
+            first, samples = run(workdir, users, args.logins)
+            print(f"{users:>8} {first * 1000:>9.1f} ms "
+                  f"{statistics.median(samples) * 1000:>6.1f} ms {percentile(samples, 0.95) * 1000:>6.1f} ms "
+                  f"{max(samples) * 1000:>6.1f} ms")
+    finally:
+        shutil.rmtree(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
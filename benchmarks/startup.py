@@ -0,0 +1,76 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Startup benchmark: loads the app module the way launching it does (without
+# opening a window) in fresh interpreters under -X importtime, reports the
+# wall time and the most expensive imports, and fails if any heavy module is
+# imported before the login window needs to paint.
+#
+#     python benchmarks/startup.py [--runs 5] [--top 10]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "FITNESS TRACER CODING.py")
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "openpyxl", "tkcalendar"]
+
+PROBE = """
+import importlib.util, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+spec = importlib.util.spec_from_file_location("fitness_tracker_app", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print("ELAPSED", time.perf_counter() - start)
+print("LOADED", " ".join(name for name in sys.argv[2:] if name in sys.modules))
+"""
+
+
+def run_probe():
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE, APP] + HEAVY_MODULES,
+                            capture_output=True, text=True, cwd=ROOT, check=True)
+    elapsed, loaded = None, []
+    for line in result.stdout.splitlines():
+        if line.startswith("ELAPSED"):
+            elapsed = float(line.split()[1])
+        elif line.startswith("LOADED"):
+            loaded = line.split()[1:]
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level imports only
+            imports.append((int(cumulative), name.strip()))
+    return elapsed, loaded, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="App startup import benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    timings = []
+    for _ in range(args.runs):
+        elapsed, loaded, imports = run_probe()
+        timings.append(elapsed)
+
+    print(f"App module load: median {statistics.median(timings) * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms over {args.runs} runs")
+    print("\nSlowest top-level imports (last run):")
+    for cumulative, name in sorted(imports, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if loaded:
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(loaded)}")
+        return 1
+    print(f"\nOK: none of {', '.join(HEAVY_MODULES)} imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
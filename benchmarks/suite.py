@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# Data and report path benchmark: generates a synthetic dataset of N users x M
+# days from the real sheet schemas and plans (every day holds a weigh-in and
+# that weekday's meals and workouts), then times the app's operations on it
+# headlessly and reports latency percentiles and the peak Python memory of one
+# call (tracemalloc):
+#
+#   save            Mark as Done plus a weigh-in for a new day, one transaction
+#   active_goal     the active goal lookup the main window does
+#   authenticate    a login (dominated by the password KDF)
+#   report_*        one report tab: read its table, aggregate, draw with Agg
+#   analytics       the nightly all-user analytics pass (fewer repeats)
+#
+# Every size gets its own fresh database, and --workbook also writes the data
+# as an .xlsx and times import_workbook on it. --json writes the results for
+# comparing runs.
+#
+#     python benchmarks/suite.py [--users 10 100] [--days 90 365] [--repeat 50] [--json out.json]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matplotlib  # noqa: E402
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+
+import analytics  # noqa: E402
+import reports  # noqa: E402
+from passwords import hash_password  # noqa: E402
+from service import GOAL_TYPES, TrackerService, day_plan  # noqa: E402
+from storage import (USERS_SHEET, WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET, NUTRITION_ROLLUP,  # noqa: E402
+                     WORKOUT_ROLLUP, Batch, export_workbook, import_workbook, open_storage)
+
+PASSWORD = "password"
+START = date(2024, 1, 1)
+
+
+def generate(storage, users, days, seed=0):
+    # Weight drifts towards each user's goal with some noise; diets alternate
+    rng = random.Random(seed)
+    password_hash = hash_password(PASSWORD)
+    batch = Batch()
+    for i in range(users):
+        username = f"user{i}"
+        goal_type = GOAL_TYPES[i % 2]
+        start_weight = rng.uniform(60, 90)
+        goal_weight = start_weight + (10 if goal_type == "Weight Gain" else -10)
+        step = 0.07 if goal_type == "Weight Gain" else -0.07
+        batch.upsert(USERS_SHEET, {"Username": username, "PasswordHash": password_hash})
+        batch.set_goal(username, {"Date": START.isoformat(), "Weight (kg)": start_weight,
+                                  "Goal Type": goal_type, "Current Goal (kg)": goal_weight})
+        weights, meals, workouts = [], [], []
+        for day in range(days):
+            current = (START + timedelta(days=day)).isoformat()
+            weights.append({"Username": username, "Date": current,
+                            "Weight (kg)": round(start_weight + step * day + rng.gauss(0, 0.3), 1),
+                            "Goal Type": goal_type, "Current Goal (kg)": goal_weight, "Active": True})
+            plan = day_plan(username, current, goal_type, i % 3 == 0)
+            meals.extend(plan['meals'])
+            workouts.extend(plan['workouts'])
+        batch.upsert(WEIGHT_SHEET, weights).upsert(FOOD_SHEET, meals).upsert(WORKOUT_SHEET, workouts)
+    storage.commit(batch)
+
+
+def measure(func, repeat):
+    # Latencies of repeat calls, then one more call under tracemalloc for the
+    # peak memory (kept apart: tracing slows every allocation down)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    samples.sort()
+    return {
+        "p50_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000,
+        "p99_ms": samples[min(len(samples) - 1, int(0.99 * len(samples)))] * 1000,
+        "max_ms": samples[-1] * 1000,
+        "peak_kb": peak / 1024,
+    }
+
+
+def report(session, table, figure):
+    fig = figure(session.report_data(table))
+    if fig is not None:
+        FigureCanvasAgg(fig).draw()
+
+
+def run(workdir, users, days, repeat, workbook):
+    path = os.path.join(workdir, f"bench_{users}x{days}.db")
+    service = TrackerService(open_storage(path=path))
+    service.storage.initialize(workbook=None)
+    started = time.perf_counter()
+    generate(service.storage, users, days)
+    results = {"generate": {"seconds": time.perf_counter() - started}}
+
+    rng = random.Random(1)
+    new_day = iter(range(days, days + 10 ** 6))
+
+    def pick():
+        return service.session(f"user{rng.randrange(users)}")
+
+    def save():
+        session = pick()
+        current = (START + timedelta(days=next(new_day))).isoformat()
+        batch = session.mark_day_done(current, False)
+        batch.operations.extend(session.log_weight(70.0, current).operations)
+        session.commit(batch)
+
+    operations = [
+        ("save", save, repeat),
+        ("active_goal", lambda: pick().active_goal(), repeat),
+        ("authenticate", lambda: service.authenticate(f"user{rng.randrange(users)}", PASSWORD),
+         max(3, repeat // 5)),
+        ("report_weight", lambda: report(pick(), WEIGHT_SHEET, reports.weight_figure), repeat),
+        ("report_nutrition", lambda: report(pick(), NUTRITION_ROLLUP, reports.nutrition_figure), repeat),
+        ("report_workouts", lambda: report(pick(), WORKOUT_ROLLUP, reports.workout_figure), repeat),
+        ("analytics", lambda: analytics.summarize(service.storage, plans=service.plans), max(3, repeat // 10)),
+    ]
+    for name, func, count in operations:
+        results[name] = measure(func, count)
+
+    if workbook:
+        xlsx = os.path.join(workdir, f"bench_{users}x{days}.xlsx")
+        started = time.perf_counter()
+        export_workbook(service.storage, xlsx)
+        exported = time.perf_counter() - started
+        target = open_storage(path=os.path.join(workdir, f"import_{users}x{days}.db"))
+        target.initialize(workbook=None)
+        started = time.perf_counter()
+        import_workbook(target, xlsx)
+        results["workbook"] = {"export_seconds": exported, "import_seconds": time.perf_counter() - started,
+                               "size_kb": os.path.getsize(xlsx) / 1024}
+        target.close()
+    service.storage.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Data and report path benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365])
+    parser.add_argument("--repeat", type=int, default=50, help="timed calls per operation")
+    parser.add_argument("--workbook", action="store_true", help="also time xlsx export/import")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="fitness_suite_")
+    all_results = {}
+    try:
+        for users in args.users:
+            for days in args.days:
+                results = all_results[f"{users}x{days}"] = run(workdir, users, days, args.repeat, args.workbook)
+                print(f"\n{users} users x {days} days (generated in {results['generate']['seconds']:.1f}s)")
+                print(f"  {'operation':<18} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'peak mem':>11}")
+                for name, stats in results.items():
+                    if "p50_ms" in stats:
+                        print(f"  {name:<18} " + " ".join(f"{stats[k]:>6.1f} ms" for k in
+                                                          ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+                              + f" {stats['peak_kb']:>8.0f} KB")
+                if "workbook" in results:
+                    stats = results["workbook"]
+                    print(f"  workbook: export {stats['export_seconds']:.1f}s, import {stats['import_seconds']:.1f}s, "
+                          f"{stats['size_kb']:.0f} KB")
+    finally:
+        shutil.rmtree(workdir)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(all_results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
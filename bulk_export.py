@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+
+from diagnostics import timed
+from storage import (WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET, NUTRITION_ROLLUP, WORKOUT_ROLLUP, BOOL_COLUMNS,
+                     SHEET_SCHEMAS, ROLLUP_SCHEMAS, sheet_columns)
+
+# --- Streaming export ---
+# Writes sheets to CSV or Parquet one chunk at a time straight from the
+# database, optionally limited to one user and a date range, so exports are
+# not bounded by memory or by the xlsx row limit. The Users sheet (password
+# hashes) is deliberately not exportable. Parquet needs pyarrow, which is only
+# imported when a Parquet export is requested.
+
+EXPORT_SHEETS = (WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET, NUTRITION_ROLLUP, WORKOUT_ROLLUP)
+EXPORT_FORMATS = {"csv": ".csv", "parquet": ".parquet"}
+CHUNK_SIZE = 50000
+
+
+def _arrow_schema(sheet_name):
+    import pyarrow as pa
+
+    types = {"TEXT": pa.string(), "REAL": pa.float64(), "INTEGER": pa.int64()}
+    schema = SHEET_SCHEMAS.get(sheet_name) or ROLLUP_SCHEMAS[sheet_name]
+    return pa.schema([
+        (name, pa.date32() if name == "Date" else pa.bool_() if name in BOOL_COLUMNS else types[sql_type])
+        for name, sql_type in schema
+    ])
+
+
+def _write_csv(chunks, path, sheet_name):
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for chunk in chunks:
+            chunk.to_csv(f, header=rows == 0, index=False)
+            rows += len(chunk)
+        if rows == 0:
+            pd.DataFrame(columns=sheet_columns(sheet_name)).to_csv(f, index=False)
+    return rows
+
+
+def _write_parquet(chunks, path, sheet_name):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)") from e
+
+    # Every chunk becomes one row group with the same explicit schema, so an
+    # all-null column in one chunk cannot change the file's column types
+    schema = _arrow_schema(sheet_name)
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            chunk['Date'] = pd.to_datetime(chunk['Date']).dt.date
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+@timed("bulk.export", sheet=1)
+def export_sheet(storage, sheet_name, path, fmt=None, username=None, start=None, end=None,
+                 chunk_size=CHUNK_SIZE):
+    # Returns the number of rows written. Like export_workbook, the file is
+    # written under a temporary name and renamed over the target at the end.
+    if sheet_name not in EXPORT_SHEETS:
+        raise ValueError(f"Cannot export {sheet_name}; choose one of {', '.join(EXPORT_SHEETS)}")
+    fmt = fmt or ("parquet" if path.lower().endswith(".parquet") else "csv")
+    base, ext = os.path.splitext(path)
+    tmp_path = f"{base}.tmp{ext}"
+    chunks = storage.iter_read(sheet_name, username=username, start=start, end=end, chunk_size=chunk_size)
+    try:
+        if fmt == "parquet":
+            rows = _write_parquet(chunks, tmp_path, sheet_name)
+        else:
+            rows = _write_csv(chunks, tmp_path, sheet_name)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return rows
+
+
+def export_sheets(storage, out_dir, sheets=EXPORT_SHEETS, fmt="csv", username=None, start=None, end=None,
+                  chunk_size=CHUNK_SIZE):
+    # One file per sheet, named <sheet>.<ext> or <username>_<sheet>.<ext>;
+    # returns {sheet: (path, rows)}
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+    for sheet_name in sheets:
+        name = f"{username}_{sheet_name}" if username else sheet_name
+        path = os.path.join(out_dir, name + EXPORT_FORMATS[fmt])
+        written[sheet_name] = (path, export_sheet(storage, sheet_name, path, fmt, username, start, end,
+                                                  chunk_size))
+    return written
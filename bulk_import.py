@@ -0,0 +1,145 @@
+import json
+import time
+from collections import Counter
+
+import pandas as pd
+
+from diagnostics import timed
+from storage import (USERS_SHEET, WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET, BOOL_COLUMNS, SHEET_KEYS,
+                     Batch, sheet_columns)
+
+# --- Bulk import ---
+# Streams large CSV / JSON exports (scales, watches, other trackers) into the
+# Weight, Food or Workout sheet. Input is read in chunks, validated and
+# normalised with vectorised pandas operations, and every chunk is committed as
+# one transaction. Rows whose key is already stored are skipped unless
+# replace=True.
+
+IMPORT_SHEETS = (WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET)
+CHUNK_SIZE = 10000
+
+REQUIRED_COLUMNS = {
+    WEIGHT_SHEET: ["Username", "Date", "Weight (kg)"],
+    FOOD_SHEET: ["Username", "Date", "Meal Type", "Food Item", "Calories"],
+    WORKOUT_SHEET: ["Username", "Date", "Muscle Group", "Exercise"],
+}
+# Optional columns and the value used when a file leaves them out
+DEFAULTS = {
+    WEIGHT_SHEET: {"Goal Type": None, "Current Goal (kg)": None, "Active": True},
+    FOOD_SHEET: {"Protein (g)": 0, "Vegetarian": False},
+    WORKOUT_SHEET: {"Sets": 0, "Reps": 0, "Duration (min)": 0, "Completed": True},
+}
+NUMERIC_COLUMNS = {"Weight (kg)", "Current Goal (kg)", "Calories", "Protein (g)", "Sets", "Reps", "Duration (min)"}
+TRUE_VALUES = {"true", "1", "1.0", "yes", "y", "t"}
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE, fmt=None):
+    # CSV and JSON lines are streamed; a single JSON array has to be parsed
+    # whole by the standard library and is then sliced into chunks
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "json")
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str)
+        return
+    with open(path, encoding="utf-8") as f:
+        first = f.read(64).lstrip()[:1]
+    if first == "[":
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        for start in range(0, len(records), chunk_size):
+            yield pd.DataFrame.from_records(records[start:start + chunk_size])
+    else:
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+
+
+def normalize(chunk, sheet_name, username=None):
+    # Returns the valid rows in storage form plus a Counter of rejection reasons
+    df = chunk.copy()
+    if username is not None:
+        df['Username'] = username
+    missing = [c for c in REQUIRED_COLUMNS[sheet_name] if c not in df.columns]
+    if missing:
+        raise ValueError(f"{sheet_name} import is missing columns: {', '.join(missing)}")
+    for column, default in DEFAULTS[sheet_name].items():
+        if column not in df.columns:
+            df[column] = default
+        elif default is not None:
+            df[column] = df[column].where(df[column].notna(), default)
+    df = df[sheet_columns(sheet_name)]
+
+    reasons = Counter()
+    valid = pd.Series(True, index=df.index)
+    for column in REQUIRED_COLUMNS[sheet_name]:
+        empty = df[column].isna() | (df[column].astype(str).str.strip() == "")
+        reasons[f"missing {column}"] += int((empty & valid).sum())
+        valid &= ~empty
+
+    dates = pd.to_datetime(df['Date'], errors='coerce', format='mixed')
+    reasons["invalid Date"] += int((dates.isna() & valid).sum())
+    valid &= dates.notna()
+    df['Date'] = dates.dt.strftime('%Y-%m-%d')
+
+    for column in NUMERIC_COLUMNS.intersection(df.columns):
+        values = pd.to_numeric(df[column], errors='coerce')
+        bad = values.isna() & df[column].notna()
+        reasons[f"invalid {column}"] += int((bad & valid).sum())
+        valid &= ~bad
+        df[column] = values
+
+    for column in BOOL_COLUMNS.intersection(df.columns):
+        if df[column].dtype != bool:
+            df[column] = df[column].astype(str).str.strip().str.lower().isin(TRUE_VALUES)
+
+    return df[valid], +reasons
+
+
+@timed("bulk.import", sheet=1)
+def bulk_import(storage, sheet_name, path, username=None, replace=False, chunk_size=CHUNK_SIZE,
+                fmt=None, on_chunk=None):
+    if sheet_name not in IMPORT_SHEETS:
+        raise ValueError(f"Cannot bulk import into {sheet_name}; choose one of {', '.join(IMPORT_SHEETS)}")
+
+    known_users = {}
+
+    def user_exists(name):
+        if name not in known_users:
+            known_users[name] = not storage.read(USERS_SHEET, username=name).empty
+        return known_users[name]
+
+    if username is not None and not user_exists(username):
+        raise ValueError(f"Unknown user: {username}")
+
+    stats = {"read": 0, "written": 0, "skipped": 0, "rejected": 0, "reasons": Counter()}
+    start = time.perf_counter()
+    for chunk in read_chunks(path, chunk_size, fmt):
+        stats["read"] += len(chunk)
+        df, reasons = normalize(chunk, sheet_name, username)
+
+        unknown = ~df['Username'].map(user_exists).astype(bool)
+        if unknown.any():
+            reasons["unknown user"] += int(unknown.sum())
+            df = df[~unknown]
+        df = df.drop_duplicates(SHEET_KEYS[sheet_name], keep='last')
+
+        if sheet_name == WEIGHT_SHEET:
+            # Weights logged outside the app belong to the user's active goal
+            for name in df.loc[df['Goal Type'].isna(), 'Username'].unique():
+                goal = storage.get_goal(name)
+                if goal is not None:
+                    rows = (df['Username'] == name) & df['Goal Type'].isna()
+                    df.loc[rows, 'Goal Type'] = goal['Goal Type']
+                    df.loc[rows, 'Current Goal (kg)'] = goal['Current Goal (kg)']
+
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        written = storage.commit(Batch().upsert(sheet_name, records, replace))[0] if records else []
+
+        # Skipped rows are keys already stored or repeated later in the chunk
+        stats["rejected"] += sum(reasons.values())
+        stats["written"] += len(written)
+        stats["skipped"] = stats["read"] - stats["rejected"] - stats["written"]
+        stats["reasons"].update(reasons)
+        if on_chunk is not None:
+            on_chunk(stats, time.perf_counter() - start)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_s"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
@@ -0,0 +1,226 @@
+import argparse
+import getpass
+import os
+import sys
+
+from bulk_export import EXPORT_SHEETS, export_sheets
+from diagnostics import log_exception
+from service import GOAL_TYPES, REPORT_RANGES, REPORT_TABLES, TrackerService, iso_date, today
+from storage import (BACKENDS, DB_FILE, SHARD_DIR, STORAGE_BACKEND, WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET,
+                     export_workbook, import_workbook, open_storage)
+
+# Command line entry point for the tracker service, for scripting and batch
+# jobs without a display. Run `python cli.py --help` for the commands.
+
+
+def cmd_register(service, args):
+    password = args.password or getpass.getpass("Password: ")
+    if not service.register(args.user, password):
+        raise ValueError(f"Username already exists: {args.user}")
+    print(f"Registered {args.user}")
+
+def cmd_start_goal(service, args):
+    session = service.session(args.user)
+    session.commit(session.start_goal(args.type, args.current, args.goal, args.date))
+    print(f"Started {args.type} goal for {args.user}: {args.current} kg -> {args.goal} kg")
+
+def cmd_complete_goal(service, args):
+    session = service.session(args.user)
+    session.commit(session.complete_goal())
+    print(f"Completed goal for {args.user}")
+
+def cmd_log_weight(service, args):
+    session = service.session(args.user)
+    session.commit(session.log_weight(args.weight, args.date))
+    print(f"Logged {args.weight} kg for {args.user} on {args.date}")
+
+def cmd_mark_done(service, args):
+    session = service.session(args.user)
+    session.commit(session.mark_day_done(args.date, args.vegetarian))
+    print(f"Marked {args.date} as done for {args.user}")
+
+def cmd_export_report(service, args):
+    from reports import window
+
+    session = service.session(args.user)
+    os.makedirs(args.out, exist_ok=True)
+    for name, table in REPORT_TABLES:
+        df = window(session.report_data(table), REPORT_RANGES[args.range])
+        path = os.path.join(args.out, f"{args.user}_{name}.csv")
+        df.to_csv(path, index=False, date_format='%Y-%m-%d')
+        print(f"Wrote {len(df)} rows to {path}")
+
+def cmd_analytics(service, args):
+    from analytics import summarize
+
+    usernames = None
+    if args.user is not None:
+        service.session(args.user)  # reject unknown users
+        usernames = [args.user]
+    summary = summarize(service.storage, usernames, service.plans)
+    if args.out:
+        summary.to_csv(args.out, index=False, date_format='%Y-%m-%d')
+        print(f"Wrote {len(summary)} users to {args.out}")
+    else:
+        print(summary.to_string(index=False))
+
+def cmd_import_workbook(service, args):
+    print(f"Imported {import_workbook(service.storage, args.path)} rows from {args.path}")
+
+def cmd_bulk_import(service, args):
+    from bulk_import import bulk_import
+
+    def progress(stats, seconds):
+        print(f"  {stats['read']} rows read, {stats['written']} written ({seconds:.1f}s)", file=sys.stderr)
+
+    stats = bulk_import(service.storage, args.sheet, args.path, username=args.user, replace=args.replace,
+                        chunk_size=args.chunk_size, fmt=args.format, on_chunk=progress)
+    print(f"Read {stats['read']} rows from {args.path} in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_s']:.0f} rows/s)")
+    print(f"  written: {stats['written']}, duplicates skipped: {stats['skipped']}, rejected: {stats['rejected']}")
+    for reason, count in stats['reasons'].most_common():
+        print(f"    {reason}: {count}")
+
+def cmd_export(service, args):
+    if args.user is not None:
+        service.session(args.user)  # reject unknown users
+    # Compared as text against the stored dates, so they must be YYYY-MM-DD
+    start = args.start and iso_date(args.start)
+    end = args.end and iso_date(args.end)
+    written = export_sheets(service.storage, args.out, args.sheets or EXPORT_SHEETS, args.format, args.user,
+                            start, end, args.chunk_size)
+    for path, rows in written.values():
+        print(f"Wrote {rows} rows to {path}")
+
+def cmd_export_workbook(service, args):
+    export_workbook(service.storage, args.path)
+    print(f"Exported workbook to {args.path}")
+
+def cmd_render_reports(service, args):
+    from batch_reports import render_reports
+
+    if args.user:
+        for username in args.user:
+            service.session(username)  # reject unknown users
+    stats = render_reports(args.backend, args.db, args.out, args.user or None, args.format,
+                           REPORT_RANGES[args.range], args.processes)
+    print(f"Rendered {stats['files']} files for {stats['users']} users to {args.out} in {stats['seconds']:.1f}s "
+          f"({stats['users'] / stats['seconds']:.1f} users/s)")
+    for username, error in stats['failed'].items():
+        print(f"  {username}: {error}", file=sys.stderr)
+
+def cmd_serve(service, args):
+    from server import run
+
+    run(service, args.host, args.port, args.workers)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fitness Tracker command line")
+    parser.add_argument("--db", help=f"database file, or directory for the sharded backend "
+                                     f"(default: {DB_FILE} / {SHARD_DIR})")
+    parser.add_argument("--backend", choices=BACKENDS, default=STORAGE_BACKEND,
+                        help="storage backend (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("register", help="create a user")
+    p.add_argument("user")
+    p.add_argument("--password", help="prompted for when omitted")
+    p.set_defaults(func=cmd_register)
+
+    p = commands.add_parser("start-goal", help="start a new goal, replacing the active one")
+    p.add_argument("user")
+    p.add_argument("--type", choices=GOAL_TYPES, required=True)
+    p.add_argument("--current", type=float, required=True, help="current weight (kg)")
+    p.add_argument("--goal", type=float, required=True, help="goal weight (kg)")
+    p.add_argument("--date", default=today())
+    p.set_defaults(func=cmd_start_goal)
+
+    p = commands.add_parser("complete-goal", help="complete the active goal")
+    p.add_argument("user")
+    p.set_defaults(func=cmd_complete_goal)
+
+    p = commands.add_parser("log-weight", help="log a weight for a day")
+    p.add_argument("user")
+    p.add_argument("weight", type=float)
+    p.add_argument("--date", default=today())
+    p.set_defaults(func=cmd_log_weight)
+
+    p = commands.add_parser("mark-done", help="mark a day's meal and workout plan as done")
+    p.add_argument("user")
+    p.add_argument("--date", default=today())
+    p.add_argument("--vegetarian", action="store_true")
+    p.set_defaults(func=cmd_mark_done)
+
+    p = commands.add_parser("export-report", help="write a user's report data to CSV files")
+    p.add_argument("user")
+    p.add_argument("--out", default="reports")
+    p.add_argument("--range", choices=REPORT_RANGES, default="all", help="last N days (default: all)")
+    p.set_defaults(func=cmd_export_report)
+
+    p = commands.add_parser("analytics", help="trend ETAs, streaks and calorie adherence per user")
+    p.add_argument("--user", help="only this user (default: every user with an active goal)")
+    p.add_argument("--out", help="write a CSV file instead of printing")
+    p.set_defaults(func=cmd_analytics)
+
+    p = commands.add_parser("import-workbook", help="import an .xlsx workbook")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_import_workbook)
+
+    p = commands.add_parser("bulk-import", help="stream a large CSV / JSON export into a sheet")
+    p.add_argument("sheet", choices=[WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET])
+    p.add_argument("path")
+    p.add_argument("--user", help="import every row for this user (ignores a Username column)")
+    p.add_argument("--format", choices=["csv", "json"], help="guessed from the file extension when omitted")
+    p.add_argument("--chunk-size", type=int, default=10000, help="rows per transaction (default: %(default)s)")
+    p.add_argument("--replace", action="store_true", help="overwrite rows whose key is already stored")
+    p.set_defaults(func=cmd_bulk_import)
+
+    p = commands.add_parser("export", help="stream sheets to CSV or Parquet files")
+    p.add_argument("sheets", nargs="*", metavar="sheet",
+                   help=f"any of {', '.join(EXPORT_SHEETS)} (default: all)")
+    p.add_argument("--user", help="only this user's rows")
+    p.add_argument("--from", dest="start", help="first date (YYYY-MM-DD)")
+    p.add_argument("--to", dest="end", help="last date (YYYY-MM-DD)")
+    p.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    p.add_argument("--out", default="export")
+    p.add_argument("--chunk-size", type=int, default=50000, help="rows per chunk (default: %(default)s)")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser("export-workbook", help="export all data to an .xlsx workbook")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_export_workbook)
+
+    p = commands.add_parser("render-reports", help="render report charts to PNG / PDF files for many users")
+    p.add_argument("--user", action="append", help="only this user (repeatable; default: every user)")
+    p.add_argument("--out", default="reports")
+    p.add_argument("--format", nargs="+", choices=["png", "pdf"], default=["png", "pdf"])
+    p.add_argument("--range", choices=REPORT_RANGES, default="all", help="last N days (default: all)")
+    p.add_argument("--processes", type=int, help="worker processes (default: one per CPU)")
+    p.set_defaults(func=cmd_render_reports)
+
+    p = commands.add_parser("serve", help="run the local HTTP/JSON API (see server.py)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    p.add_argument("--workers", type=int, default=8, help="threads running storage calls (default: %(default)s)")
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    service = TrackerService(open_storage(args.backend, **({"path": args.db} if args.db else {})))
+    try:
+        service.initialize()
+        args.func(service, args)
+    except ValueError as e:
+        log_exception(f"cli.{args.command}", e)
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        service.storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import collections
+import contextlib
+import functools
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+# --- Diagnostics ---
+# Timing spans around storage and rendering operations. Every span is kept in
+# a ring buffer of recent operations (for the app's diagnostics window and
+# stats()) and, when logging is configured, written as one JSON object per
+# line:
+#
+#   {"ts": 1718000000.123, "level": "INFO", "op": "sqlite.commit", "ms": 3.21,
+#    "rows": 7, "thread": "storage-writer"}
+#
+# Logging is off unless configure_logging() is called or FITNESS_TRACKER_LOG
+# names a file ("-" for stderr). Only the standard library is imported, so the
+# app can import this at startup.
+
+LOG_FILE = os.environ.get("FITNESS_TRACKER_LOG")
+RECENT_SPANS = 1000
+
+logger = logging.getLogger("fitness_tracker")
+_recent = collections.deque(maxlen=RECENT_SPANS)
+_recent_lock = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname}
+        entry.update(getattr(record, "fields", None) or {"message": record.getMessage()})
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(path=LOG_FILE, level=logging.INFO):
+    if not path or logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr) if path == "-" else logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(JsonLinesFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def log_exception(op, error, **fields):
+    # For errors that are handled (shown to the user) rather than raised.
+    # Without a configured handler logging would fall back to printing the
+    # traceback on stderr, on top of the message the user is shown.
+    if not logger.handlers:
+        return
+    logger.error(op, exc_info=(type(error), error, error.__traceback__),
+                 extra={"fields": {"op": op, "error": f"{type(error).__name__}: {error}", **fields}})
+
+
+def _count_rows(result):
+    # DataFrames and row lists count their rows; a commit's result list counts
+    # the rows of each of its operations
+    if isinstance(result, list):
+        return sum(len(item) if isinstance(item, list) else 1 for item in result)
+    if hasattr(result, "__len__") and not isinstance(result, (str, dict)):
+        return len(result)
+    return None
+
+
+class Span:
+    def __init__(self, op, fields):
+        self.op = op
+        self.fields = fields
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+
+@contextlib.contextmanager
+def span(op, **fields):
+    current = Span(op, fields)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        entry = {"op": op, "ms": round((time.perf_counter() - started) * 1000, 3), **current.fields,
+                 "thread": threading.current_thread().name}
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+        with _recent_lock:
+            _recent.append(entry)
+        if logger.handlers:
+            logger.log(logging.ERROR if error is not None else logging.INFO, op, extra={"fields": entry})
+
+
+def timed(op, **arg_fields):
+    # Decorator form of span that also records how many rows the call returned.
+    # arg_fields name positional arguments to record, e.g. sheet=1 records
+    # args[1] (after self) as "sheet".
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            fields = {name: args[index] for name, index in arg_fields.items() if index < len(args)}
+            with span(op, **fields) as current:
+                result = func(*args, **kwargs)
+                rows = _count_rows(result)
+                if rows is not None:
+                    current.set(rows=rows)
+                return result
+        return wrapper
+    return decorate
+
+
+def recent(limit=None):
+    with _recent_lock:
+        entries = list(_recent)
+    return entries[-limit:] if limit else entries
+
+
+def stats():
+    # Per-operation summary of the recent spans: count, p50/p95/max ms, rows of
+    # the last call and the number that failed
+    by_op = collections.defaultdict(list)
+    for entry in recent():
+        by_op[entry["op"]].append(entry)
+    summary = {}
+    for op, entries in sorted(by_op.items()):
+        latencies = sorted(entry["ms"] for entry in entries)
+        summary[op] = {
+            "count": len(entries),
+            "p50_ms": statistics.median(latencies),
+            "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+            "max_ms": latencies[-1],
+            "last_rows": entries[-1].get("rows"),
+            "errors": sum("error" in entry for entry in entries),
+        }
+    return summary
+
+
+configure_logging()
@@ -0,0 +1,362 @@
+import glob
+import json
+import os
+import threading
+import zlib
+
+from diagnostics import log_exception, span
+from storage import Batch
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# --- Write-ahead journal ---
+# SQLite commits are atomic, but in WAL mode with synchronous=NORMAL the last
+# commits before a power loss can be rolled back. JournaledStorage closes that
+# gap without an fsync per transaction. Every batch is first appended to a
+# journal file. Concurrent commits share one fsync (group commit), and only
+# then is the batch committed to the database. That transaction also records
+# the batch's sequence number in the Journal table.
+#
+# initialize() replays journal records that are newer than the database's
+# recorded position. A background thread compacts the journal every
+# COMPACT_INTERVAL seconds, or sooner once it reaches COMPACT_BYTES: it
+# checkpoints the database (after which SQLite has synced every commit) and
+# drops the records that are now applied.
+#
+# Each running instance holds its own journal file, locked while it runs:
+# <database>.journal, then <database>.journal.1 and so on when several
+# instances share the data. A journal that no running instance holds was left
+# by one that crashed. It is replayed by the next instance that starts, and
+# running instances adopt such journals on every compaction pass.
+#
+# A replayed record is applied as if it had committed late: if another
+# instance wrote the same key (a weight for the same day, the user's goal)
+# between the crash and the replay, the replayed write wins. Rows carry no
+# version to tell the two apart, so adopting orphans promptly is what keeps
+# that window short (at most COMPACT_INTERVAL while other instances run).
+# Writes based on the active goal carry an expect_goal check, so a replayed
+# one is dropped if the goal changed in the meantime.
+#
+# Records are single lines, "<crc32> {"seq": n, "ops": [...]}". A torn final
+# line from a crash fails its checksum and is dropped; its batch never
+# reached the database either.
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_INTERVAL = 30  # seconds between background compactions
+COMPACT_BYTES = 4 << 20  # journal size that triggers a compaction early
+MAX_JOURNALS = 64
+
+
+def _try_lock(f):
+    # Non-blocking exclusive lock, released when f is closed or the process dies
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _fsync_dir(path):
+    # Makes a created or renamed file's directory entry durable (POSIX only)
+    if os.name == "posix":
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _json_value(value):
+    if hasattr(value, "strftime"):
+        return value.strftime('%Y-%m-%d')
+    if hasattr(value, "item"):  # numpy scalars coming from DataFrames
+        return value.item()
+    raise TypeError(f"Cannot journal a {type(value).__name__}")
+
+
+def _encode_ops(batch):
+    return json.dumps(batch.operations, separators=(",", ":"), default=_json_value)
+
+
+def _record(seq, ops):
+    data = f'{{"seq":{seq},"ops":{ops}}}'.encode()
+    return b"%08x " % zlib.crc32(data) + data + b"\n"
+
+
+def read_records(path):
+    # Returns ([(seq, Batch)], byte length of the intact records)
+    records, end = [], 0
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return records, end
+    with f:
+        for line in f:
+            crc, _, data = line.rstrip(b"\n").partition(b" ")
+            if not line.endswith(b"\n") or crc != b"%08x" % zlib.crc32(data):
+                break
+            record = json.loads(data)
+            batch = Batch()
+            batch.operations = [(op, tuple(args)) for op, args in record["ops"]]
+            records.append((record["seq"], batch))
+            end += len(line)
+    return records, end
+
+
+class Journal:
+    # One journal file, appended to by any number of threads
+    def __init__(self, path, lock_file):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._lock_file = lock_file
+        records, end = read_records(path)
+        self.last_seq = records[-1][0] if records else 0
+        created = not os.path.exists(path)
+        self._file = open(path, "ab")
+        self._file.truncate(end)  # drop a torn final record
+        if created:
+            _fsync_dir(path)
+        self._synced = self.last_seq
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    @classmethod
+    def open_free(cls, base):
+        # The first journal slot for base that no running instance holds
+        for i in range(MAX_JOURNALS):
+            journal = cls.try_open(base if i == 0 else f"{base}.{i}")
+            if journal is not None:
+                return journal
+        raise RuntimeError(f"More than {MAX_JOURNALS} instances are using {base}")
+
+    @classmethod
+    def try_open(cls, path):
+        lock_file = open(path + ".lock", "a+b")
+        if not _try_lock(lock_file):
+            lock_file.close()
+            return None
+        return cls(path, lock_file)
+
+    def size(self):
+        with self._write_lock:
+            return self._file.tell()
+
+    def records(self):
+        with self._write_lock:
+            self._file.flush()
+            return read_records(self.path)[0]
+
+    def append(self, batch):
+        # Returns the record's sequence number; it is on disk after sync(seq)
+        ops = _encode_ops(batch)
+        with self._write_lock:
+            seq = self.last_seq + 1
+            self._file.write(_record(seq, ops))
+            self._file.flush()
+            self.last_seq = seq
+        return seq
+
+    def sync(self, seq):
+        # Group commit: whoever gets the lock fsyncs every record written so
+        # far, so the threads queued behind it usually find theirs already done
+        with self._sync_lock:
+            if self._synced >= seq:
+                return
+            with self._write_lock:
+                last = self.last_seq
+            with span("journal.fsync", rows=last - self._synced):
+                os.fsync(self._file.fileno())
+            self._synced = last
+
+    def rewrite(self, after):
+        # Keeps only the records newer than after; returns how many were kept
+        with self._sync_lock, self._write_lock:
+            self._file.flush()
+            kept = [(seq, batch) for seq, batch in read_records(self.path)[0] if seq > after]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for seq, batch in kept:
+                    f.write(_record(seq, _encode_ops(batch)))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            _fsync_dir(self.path)
+            self._file = open(self.path, "ab")
+            self._synced = self.last_seq
+            return len(kept)
+
+    def close(self):
+        self._file.close()
+        self._lock_file.close()
+
+
+class JournaledStorage:
+    def __init__(self, backend, path=None, compact_interval=COMPACT_INTERVAL, compact_bytes=COMPACT_BYTES):
+        self.backend = backend
+        self.base = path or backend.path + JOURNAL_SUFFIX
+        self.journal = Journal.open_free(self.base)
+        self.compact_interval = compact_interval
+        self.compact_bytes = compact_bytes
+        self._recovered = False
+        self._recover_lock = threading.Lock()
+        # Commits reach the database in sequence order, so the Journal table's
+        # position always means "everything up to here is applied"
+        self._order = threading.Condition()
+        self._applied = None
+        self._compactor = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def _apply(self, name, seq, batch):
+        # Replays one record; a batch the database rejects (a goal conflict,
+        # invalid data) is marked applied without its writes, as it was when
+        # it was first committed
+        try:
+            self.backend.commit(_marked(batch, name, seq))
+        except ValueError as e:
+            log_exception("journal.replay", e, journal=name, seq=seq)
+            self.backend.commit(Batch().journal_mark(name, seq))
+
+    def _replay(self, journal):
+        # Returns the last sequence number used, which new records follow
+        position = self.backend.journal_position(journal.name)
+        pending = [(seq, batch) for seq, batch in journal.records() if seq > position]
+        with span("journal.replay", journal=journal.name, rows=len(pending)):
+            for seq, batch in pending:
+                self._apply(journal.name, seq, batch)
+        return max(self.backend.journal_position(journal.name, latest=True), journal.last_seq)
+
+    def _replay_orphans(self):
+        # Replays and empties every journal left behind by an instance that is
+        # no longer running
+        for path in sorted(glob.glob(glob.escape(self.base) + "*")):
+            if path == self.journal.path or path.endswith((".lock", ".tmp")):
+                continue
+            orphan = Journal.try_open(path)
+            if orphan is not None:
+                try:
+                    if orphan.size():
+                        self._replay(orphan)
+                        orphan.rewrite(after=orphan.last_seq)
+                finally:
+                    orphan.close()
+
+    def recover(self):
+        # Replays this instance's journal and any orphaned ones
+        with self._recover_lock:
+            if self._recovered:
+                return
+            self._replay_orphans()
+            position = self._replay(self.journal)
+            with self._order:
+                self.journal.last_seq = position
+                self._applied = position
+            self._recovered = True
+
+    def initialize(self, *args, **kwargs):
+        self.backend.initialize(*args, **kwargs)
+        self.recover()
+        if self._compactor is None:
+            self._compactor = threading.Thread(target=self._compact_loop, name="journal-compactor", daemon=True)
+            self._compactor.start()
+
+    def commit(self, batch):
+        self.recover()
+        seq = self.journal.append(batch)
+        try:
+            # Once seq is taken it must reach _applied whatever fails, or
+            # every later commit would wait for it forever
+            try:
+                self.journal.sync(seq)
+            finally:
+                with self._order:
+                    self._order.wait_for(lambda: self._applied == seq - 1)
+            results = self.backend.commit(_marked(batch, self.journal.name, seq))
+        except Exception:
+            # Failed as a whole: record that, so a replay does not apply it
+            # after the caller was told it failed
+            try:
+                self.backend.commit(Batch().journal_mark(self.journal.name, seq))
+            except Exception as e:
+                log_exception("journal.mark", e, seq=seq)
+            raise
+        finally:
+            with self._order:
+                self._applied = seq
+                self._order.notify_all()
+        if self.journal.size() >= self.compact_bytes:
+            self._wake.set()
+        return results[:-1]
+
+    # Direct writes go through the journal too, as one-operation batches
+    def upsert(self, sheet_name, data, replace=True):
+        batch = Batch().upsert(sheet_name, data, replace)
+        return self.commit(batch)[0] if batch else []
+
+    def set_goal(self, username, goal):
+        return self.commit(Batch().set_goal(username, goal))[0]
+
+    def clear_goal(self, username):
+        return self.commit(Batch().clear_goal(username))[0]
+
+    def compact(self):
+        # Returns the number of records kept (those committed after the
+        # checkpoint started, or every record when a reader kept the
+        # checkpoint from completing: their commits may only be in the WAL)
+        with span("journal.compact") as current:
+            with self._order:
+                applied = self._applied
+            if self.backend.checkpoint():
+                kept = self.journal.rewrite(after=applied)
+            else:
+                kept = len(self.journal.records())
+            current.set(kept=kept)
+        return kept
+
+    def _compact_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.compact_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                with self._recover_lock:
+                    self._replay_orphans()
+            except Exception as e:
+                log_exception("journal.replay", e)
+            if self.journal.size():
+                try:
+                    self.compact()
+                except Exception as e:
+                    log_exception("journal.compact", e)
+
+    def close(self):
+        if self._compactor is not None:
+            self._stop.set()
+            self._wake.set()
+            self._compactor.join()
+            self._compactor = None
+            try:
+                self.compact()
+            except Exception as e:
+                log_exception("journal.compact", e)
+        self.journal.close()
+        self.backend.close()
+
+
+def _marked(batch, name, seq):
+    marked = Batch()
+    marked.operations = batch.operations + [("journal_mark", (name, seq))]
+    return marked
@@ -0,0 +1,79 @@
+import base64
+import hashlib
+import hmac
+import os
+
+# --- Password hashing ---
+# Hashes are stored as "scheme$parameters$salt$hash" so every user keeps the
+# parameters their hash was made with, and the defaults below can be raised
+# without breaking existing logins: verify_password reports when a stored hash
+# was made with other than the current defaults (or is a legacy unsalted
+# SHA-256 hex digest) and the service rehashes it on that login.
+#
+#   scrypt$16384$8$1$<salt>$<hash>
+#   pbkdf2_sha256$600000$<salt>$<hash>
+
+SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1}
+PBKDF2_ITERATIONS = 600000
+SALT_BYTES = 16
+HASH_BYTES = 32
+# scrypt needs an OpenSSL build that provides it; PBKDF2 is always available
+DEFAULT_SCHEME = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _derive(scheme, params, password, salt):
+    if scheme == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=128 * n * r * p + 2 ** 20,
+                              dklen=HASH_BYTES)
+    if scheme == "pbkdf2_sha256":
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=HASH_BYTES)
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+
+def _default_params(scheme):
+    if scheme == "scrypt":
+        return (SCRYPT_PARAMS["n"], SCRYPT_PARAMS["r"], SCRYPT_PARAMS["p"])
+    return (PBKDF2_ITERATIONS,)
+
+
+def hash_password(password, scheme=DEFAULT_SCHEME):
+    params = _default_params(scheme)
+    salt = os.urandom(SALT_BYTES)
+    digest = _derive(scheme, params, password, salt)
+    return "$".join([scheme, *map(str, params), _b64(salt), _b64(digest)])
+
+
+def legacy_hash(password):
+    # The original unsalted format, only used to check not-yet-upgraded rows
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def verify_password(password, stored):
+    # Returns (matches, needs_rehash)
+    if not stored:
+        return False, False
+    if "$" not in stored:
+        return hmac.compare_digest(legacy_hash(password), stored), True
+    scheme, *params, salt, digest = stored.split("$")
+    params = tuple(int(value) for value in params)
+    derived = _derive(scheme, params, password, base64.b64decode(salt))
+    matches = hmac.compare_digest(derived, base64.b64decode(digest))
+    return matches, scheme != DEFAULT_SCHEME or params != _default_params(scheme)
+
+
+_dummy_hash = None
+
+
+def dummy_verify(password):
+    # Used when the username does not exist, so an unknown user costs the same
+    # KDF call as a wrong password
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password("")
+    verify_password(password, _dummy_hash)
@@ -0,0 +1,125 @@
+import json
+import os
+
+# Muscle group exercise plan
+muscle_workout_plan = {
+    "Monday": ("Cardio + Shoulders", ["Running (30min)", "Military Press", "Lateral Raise"]),
+    "Tuesday": ("Cardio + Chest", ["Cycling (30min)", "Bench Press", "Incline Dumbbell Press"]),
+    "Wednesday": ("Cardio + Back", ["Swimming (30min)", "Pull-ups", "Deadlift"]),
+    "Thursday": ("Cardio + Abs", ["Jump Rope (30min)", "Plank", "Crunches"]),
+    "Friday": ("Cardio + Arms", ["Rowing (30min)", "Barbell Curl", "Skull Crusher"]),
+    "Saturday": ("Cardio + Legs", ["HIIT (30min)", "Squats", "Lunges"]),
+    "Sunday": ("Rest", [])
+}
+
+# Meal plans
+meal_plans = {
+    "Weight Loss": {
+        "Vegetarian": {
+            "Breakfast": {"item": "Oats with berries", "calories": 250, "protein": 10},
+            "Lunch": {"item": "Salad with lentils", "calories": 300, "protein": 15},
+            "Dinner": {"item": "Grilled vegetables with quinoa", "calories": 350, "protein": 12},
+            "Snacks": {"item": "Greek yogurt", "calories": 100, "protein": 8}
+        },
+        "Non-Vegetarian": {
+            "Breakfast": {"item": "Egg whites with spinach", "calories": 250, "protein": 20},
+            "Lunch": {"item": "Grilled chicken with vegetables", "calories": 300, "protein": 30},
+            "Dinner": {"item": "Baked fish with asparagus", "calories": 350, "protein": 25},
+            "Snacks": {"item": "Protein shake", "calories": 100, "protein": 20}
+        }
+    },
+    "Weight Gain": {
+        "Vegetarian": {
+            "Breakfast": {"item": "Paneer + Oats", "calories": 500, "protein": 30},
+            "Lunch": {"item": "Lentils + Rice + Curd", "calories": 600, "protein": 35},
+            "Dinner": {"item": "Tofu + Veggies + Quinoa", "calories": 550, "protein": 40},
+            "Snacks": {"item": "Nuts + Banana", "calories": 300, "protein": 10}
+        },
+        "Non-Vegetarian": {
+            "Breakfast": {"item": "Eggs + Toast", "calories": 500, "protein": 30},
+            "Lunch": {"item": "Chicken + Rice + Veggies", "calories": 600, "protein": 35},
+            "Dinner": {"item": "Fish + Brown Rice + Salad", "calories": 550, "protein": 40},
+            "Snacks": {"item": "Protein bar", "calories": 300, "protein": 20}
+        }
+    }
+}
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+DIETS = {True: "Vegetarian", False: "Non-Vegetarian"}
+
+# Optional JSON file of custom plans. Top-level "workouts" / "meals" replace
+# entries of the built-in plans above (same shape; weekdays, goal types, diets
+# or meals that are left out keep the built-in ones), and "users" maps a
+# username to its own "workouts" / "meals" overrides on top of those.
+PLAN_FILE = os.environ.get("FITNESS_TRACKER_PLANS", "custom_plans.json")
+
+
+def _merge(base, override):
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def compile_plans(workouts, meals):
+    # (weekday 0-6, goal type, vegetarian) -> the day's plan, with the Food and
+    # Workout rows "Mark as Done" saves minus Username and Date
+    table = {}
+    for weekday, day_name in enumerate(WEEKDAYS):
+        muscle_group, exercises = workouts.get(day_name, ("Rest", []))
+        workout_rows = []
+        if muscle_group != "Rest":
+            workout_rows = [{
+                "Muscle Group": muscle_group,
+                "Exercise": exercise,
+                "Sets": 3,
+                "Reps": 10,
+                "Duration (min)": 30 if "Cardio" in muscle_group else 0,
+                "Completed": True
+            } for exercise in exercises]
+        for goal_type, diets in meals.items():
+            for vegetarian, diet in DIETS.items():
+                meal_plan = diets[diet]
+                table[weekday, goal_type, vegetarian] = {
+                    "muscle_group": muscle_group,
+                    "exercises": list(exercises),
+                    "meal_plan": meal_plan,
+                    "meal_rows": [{
+                        "Meal Type": meal_type,
+                        "Food Item": details['item'],
+                        "Calories": details['calories'],
+                        "Protein (g)": details['protein'],
+                        "Vegetarian": vegetarian
+                    } for meal_type, details in meal_plan.items()],
+                    "workout_rows": workout_rows,
+                }
+    return table
+
+
+class PlanTable:
+    # Every plan is compiled once, when the table is built; lookups are a dict
+    # access on (weekday, goal type, diet), per user when they have custom plans
+    def __init__(self, workouts=muscle_workout_plan, meals=meal_plans, users=None):
+        self.plans = compile_plans(workouts, meals)
+        self.user_plans = {
+            username: compile_plans(_merge(workouts, custom.get("workouts", {})),
+                                    _merge(meals, custom.get("meals", {})))
+            for username, custom in (users or {}).items()
+        }
+
+    def lookup(self, weekday, goal_type, vegetarian, username=None):
+        return self.user_plans.get(username, self.plans)[weekday, goal_type, bool(vegetarian)]
+
+
+def load_plans(path=PLAN_FILE):
+    # Built-in plans, with the custom plans from path applied when it exists
+    if not path or not os.path.exists(path):
+        return PlanTable()
+    with open(path, encoding="utf-8") as f:
+        custom = json.load(f)
+    return PlanTable(_merge(muscle_workout_plan, custom.get("workouts", {})),
+                     _merge(meal_plans, custom.get("meals", {})),
+                     custom.get("users"))
@@ -0,0 +1,114 @@
+import os
+import pandas as pd
+from matplotlib.figure import Figure
+
+from diagnostics import timed
+
+# Report figures are built with the object-oriented Figure API rather than
+# pyplot, so they are never registered with pyplot's global figure manager and
+# are freed as soon as the window showing them lets go of them. They only need
+# a canvas to be attached (FigureCanvasTkAgg in the app, Agg when headless).
+#
+# Long histories are windowed to the selected date range and then bucketed into
+# the finest of daily/weekly/monthly/quarterly/yearly points that keeps each
+# chart at or below MAX_POINTS, so drawing cost does not grow with history.
+
+DATE_RANGES = {
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Last 365 days": 365,
+    "All": None,
+}
+MAX_POINTS = int(os.environ.get("FITNESS_TRACKER_MAX_POINTS", "120"))
+
+# (label, pandas period) from finest to coarsest
+BUCKETS = [("Daily", None), ("Weekly", "W"), ("Monthly", "M"), ("Quarterly", "Q"), ("Yearly", "Y")]
+
+
+def window(df, days=None, today=None):
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Date'])
+    if days is not None:
+        today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+        df = df[df['Date'] > today - pd.Timedelta(days=days)]
+    return df.sort_values('Date')
+
+def bucket_dates(dates, max_points=MAX_POINTS):
+    # Returns the bucket label and the bucket start date for every entry
+    for label, period in BUCKETS:
+        buckets = dates if period is None else dates.dt.to_period(period).dt.start_time
+        if buckets.nunique() <= max_points or period == BUCKETS[-1][1]:
+            return label, buckets
+
+
+@timed("report.weight_figure")
+def weight_figure(weights, days=None, max_points=MAX_POINTS):
+    df = window(weights, days)
+    if df.empty:
+        return None
+    label, buckets = bucket_dates(df['Date'], max_points)
+    series = df.groupby(buckets)['Weight (kg)'].mean()
+
+    fig = Figure(figsize=(8, 4))
+    ax = fig.add_subplot()
+    ax.plot(series.index, series.values, marker='o', color="#0984e3", label='Weight')
+
+    if 'Current Goal (kg)' in df.columns:
+        goal_weight = df['Current Goal (kg)'].iloc[0]
+        # Weights imported or logged without an active goal have none
+        if pd.notna(goal_weight):
+            ax.axhline(y=goal_weight, color='r', linestyle='--', label='Goal Weight')
+
+    ax.set_title("Weight Progress" if label == "Daily" else f"Weight Progress ({label.lower()} average)")
+    ax.set_ylabel("Weight (kg)")
+    ax.legend()
+    ax.grid(True)
+    return fig
+
+
+@timed("report.nutrition_figure")
+def nutrition_figure(daily_nutrition, days=None, max_points=MAX_POINTS):
+    df = window(daily_nutrition, days)
+    if df.empty:
+        return None
+    label, buckets = bucket_dates(df['Date'], max_points)
+    totals = df.groupby(buckets)[['Calories', 'Protein (g)']].sum()
+
+    fig = Figure(figsize=(8, 6))
+    ax1, ax2 = fig.subplots(2, 1)
+
+    ax1.plot(totals.index, totals['Calories'], marker='o', color="#00b894", label='Calories')
+    ax1.set_title(f"{label} Calorie Intake")
+    ax1.set_ylabel("Calories")
+    ax1.legend()
+    ax1.grid(True)
+
+    ax2.plot(totals.index, totals['Protein (g)'], marker='o', color="#6c5ce7", label='Protein')
+    ax2.set_title(f"{label} Protein Intake")
+    ax2.set_ylabel("Protein (g)")
+    ax2.legend()
+    ax2.grid(True)
+
+    fig.tight_layout()
+    return fig
+
+
+@timed("report.workout_figure")
+def workout_figure(daily_workouts, days=None, max_points=MAX_POINTS):
+    df = window(daily_workouts, days)
+    if df.empty:
+        return None
+    label, buckets = bucket_dates(df['Date'], max_points)
+    workout_summary = df.groupby([buckets, 'Muscle Group'], observed=True)['Exercises'].sum().unstack(fill_value=0)
+    workout_summary.index = workout_summary.index.strftime('%Y-%m-%d')
+
+    fig = Figure(figsize=(8, 4))
+    ax = fig.add_subplot()
+    workout_summary.plot(kind='bar', stacked=True, ax=ax)
+    ax.set_title("Workout Frequency by Muscle Group" if label == "Daily"
+                 else f"{label} Workout Frequency by Muscle Group")
+    ax.set_ylabel("Number of Exercises")
+    ax.legend(title="Muscle Group")
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return fig
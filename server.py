@@ -0,0 +1,250 @@
+import asyncio
+import functools
+import json
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from diagnostics import log_exception, span
+from service import REPORT_RANGES, REPORT_TABLES, iso_date
+from storage import ConflictError
+
+# --- HTTP/JSON API ---
+# A local server for phones and kiosks over the same TrackerService the app
+# and CLI use. HTTP/1.1 with keep-alive is handled on one asyncio loop, and
+# every service call (storage reads and writes, password hashing) runs on a
+# pool of worker threads, which bounds how many requests touch storage at a
+# time. Writes are committed before the response is sent.
+#
+#   POST   /login           {"username", "password"} -> {"token"}
+#   GET    /goal            the active goal (null when there is none)
+#   POST   /goal            {"goal_type", "current_weight", "goal_weight", "date"?}
+#   DELETE /goal            complete the active goal
+#   POST   /weight          {"weight", "date"?}
+#   GET    /plan            ?date=YYYY-MM-DD&vegetarian=1
+#   POST   /done            {"date"?, "vegetarian"?} marks the day's plan as done
+#   GET    /reports/<name>  ?range=30|90|365|all, name: weight, nutrition or workouts
+#
+# Every route but /login needs an "Authorization: Bearer <token>" header.
+#
+#     python cli.py serve [--host 127.0.0.1] [--port 8080] [--workers 8]
+
+WORKERS = 8
+TOKEN_TTL = 12 * 3600  # seconds a login token stays valid
+IDLE_TIMEOUT = 30  # seconds a kept-alive connection may wait for its next request
+MAX_BODY = 1 << 20
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _records(df):
+    if 'Date' in df.columns:
+        df = df.assign(Date=df['Date'].dt.strftime('%Y-%m-%d'))
+    return json.loads(df.to_json(orient="records"))
+
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes")
+
+
+class TrackerApi:
+    # The routes, as blocking functions of (session, body, query) run on the
+    # worker pool
+    def __init__(self, service, token_ttl=TOKEN_TTL):
+        self.service = service
+        self.token_ttl = token_ttl
+        self._tokens = {}  # token -> (username, expiry)
+        self._tokens_lock = threading.Lock()
+        self.routes = {
+            ("GET", "/goal"): self.get_goal,
+            ("POST", "/goal"): self.start_goal,
+            ("DELETE", "/goal"): self.complete_goal,
+            ("POST", "/weight"): self.log_weight,
+            ("GET", "/plan"): self.day_plan,
+            ("POST", "/done"): self.mark_done,
+        }
+        for name, table in REPORT_TABLES:
+            self.routes[("GET", f"/reports/{name}")] = functools.partial(self.report, table=table)
+
+    def login(self, body):
+        session = self.service.authenticate(str(body.get("username", "")), str(body.get("password", "")))
+        if session is None:
+            raise HttpError(401, "Invalid username or password")
+        token = secrets.token_urlsafe(32)
+        with self._tokens_lock:
+            now = time.monotonic()
+            self._tokens = {t: entry for t, entry in self._tokens.items() if entry[1] > now}
+            self._tokens[token] = (session.username, now + self.token_ttl)
+        return {"token": token, "username": session.username}
+
+    def session(self, authorization):
+        token = authorization[7:] if authorization.startswith("Bearer ") else None
+        with self._tokens_lock:
+            username, expiry = self._tokens.get(token, (None, 0))
+        if username is None or expiry <= time.monotonic():
+            raise HttpError(401, "Log in first")
+        return self.service.session(username)
+
+    def get_goal(self, session, body, query):
+        return session.active_goal()
+
+    def start_goal(self, session, body, query):
+        try:
+            batch = session.start_goal(body["goal_type"], float(body["current_weight"]), float(body["goal_weight"]),
+                                       body.get("date"))
+        except (KeyError, TypeError) as e:
+            raise HttpError(400, f"Expected goal_type, current_weight and goal_weight: {e}")
+        session.commit(batch)
+        return session.active_goal()
+
+    def complete_goal(self, session, body, query):
+        session.commit(session.complete_goal())
+        return None
+
+    def log_weight(self, session, body, query):
+        try:
+            weight = float(body["weight"])
+        except (KeyError, TypeError, ValueError):
+            raise HttpError(400, "Expected a numeric weight")
+        date = iso_date(body.get("date"))
+        session.commit(session.log_weight(weight, date))
+        return {"date": date, "weight": weight}
+
+    def day_plan(self, session, body, query):
+        date = iso_date(query.get("date"))
+        plan = session.day_plan(date, _flag(query.get("vegetarian")))
+        return {"date": date, **{key: plan[key] for key in ("muscle_group", "exercises", "meal_plan")}}
+
+    def mark_done(self, session, body, query):
+        date = iso_date(body.get("date"))
+        session.commit(session.mark_day_done(date, _flag(body.get("vegetarian"))))
+        return {"date": date, "status": "completed"}
+
+    def report(self, session, body, query, table):
+        from reports import window
+
+        days = query.get("range", "all")
+        if days not in REPORT_RANGES:
+            raise HttpError(400, f"range must be one of {', '.join(REPORT_RANGES)}")
+        df = window(session.report_data(table), REPORT_RANGES[days])
+        return _records(df)
+
+    def handle(self, method, path, query, headers, body):
+        # Returns (status, JSON-able result); runs on a worker thread
+        if path == "/login":
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            return 200, self.login(body)
+        route = self.routes.get((method, path))
+        if route is None:
+            if any(p == path for _, p in self.routes):
+                raise HttpError(405, f"{method} is not allowed on {path}")
+            raise HttpError(404, f"No such endpoint: {path}")
+        session = self.session(headers.get("authorization", ""))
+        return (201 if method == "POST" else 200), route(session, body, query)
+
+
+class TrackerServer:
+    def __init__(self, service, workers=WORKERS, idle_timeout=IDLE_TIMEOUT):
+        self.api = TrackerApi(service)
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    async def _read_request(self, reader):
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        method, target, version = request_line.split(" ", 2)
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        keep_alive = (headers.get("connection", "").lower() != "close" if version == "HTTP/1.1"
+                      else headers.get("connection", "").lower() == "keep-alive")
+        return method.upper(), url.path.rstrip("/") or "/", query, headers, body, keep_alive
+
+    async def _respond(self, method, path, query, headers, raw_body):
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise HttpError(400, "Expected a JSON object")
+        except ValueError as e:  # JSONDecodeError, or a body that is not UTF-8
+            return 400, {"error": f"Invalid JSON: {e}"}
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        loop = asyncio.get_running_loop()
+        with span("http.request", method=method, path=path) as current:
+            try:
+                status, result = await loop.run_in_executor(self.executor, self.api.handle, method, path,
+                                                            query, headers, body)
+            except HttpError as e:
+                status, result = e.status, {"error": str(e)}
+            except ConflictError as e:
+                status, result = 409, {"error": str(e)}
+            except ValueError as e:
+                status, result = 400, {"error": str(e)}
+            except Exception as e:
+                log_exception("http.request", e, method=method, path=path)
+                status, result = 500, {"error": "Internal server error"}
+            current.set(status=status)
+        return status, result
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    method, path, query, headers, body, keep_alive = await self._read_request(reader)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except HttpError as e:
+                    status, result, keep_alive = e.status, {"error": str(e)}, False
+                except (ValueError, asyncio.LimitOverrunError):
+                    status, result, keep_alive = 400, {"error": "Malformed request"}, False
+                else:
+                    status, result = await self._respond(method, path, query, headers, body)
+                payload = json.dumps(result, default=str).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}"
+                    f"\r\n\r\n".encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080, on_ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        try:
+            if on_ready is not None:
+                on_ready(server.sockets[0].getsockname()[:2])
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def run(service, host="127.0.0.1", port=8080, workers=WORKERS):
+    def ready(address):
+        print(f"Listening on http://{address[0]}:{address[1]} ({workers} workers)", flush=True)
+
+    try:
+        asyncio.run(TrackerServer(service, workers).serve(host, port, on_ready=ready))
+    except KeyboardInterrupt:
+        pass
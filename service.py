@@ -0,0 +1,285 @@
+import math
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from diagnostics import timed
+from passwords import dummy_verify, hash_password, verify_password
+from plans import load_plans
+from storage import (USERS_SHEET, WEIGHT_SHEET, FOOD_SHEET, WORKOUT_SHEET, NUTRITION_ROLLUP, WORKOUT_ROLLUP, Batch,
+                     normalize_date, open_storage)
+
+# --- Tracker service ---
+# Everything the app does, without tkinter or module-level state. A
+# TrackerService wraps one storage object and a Session carries the logged-in
+# user explicitly. Write methods return a storage Batch and save nothing
+# themselves: the caller commits it (session.commit(batch) from scripts, the
+# background writer in the app).
+
+GOAL_TYPES = ("Weight Gain", "Weight Loss")
+COMPLETED, PARTIAL, MISSED = "completed", "partial", "missed"
+# Report data a user can export or fetch: (name, table), and the ranges
+# offered as "last N days"
+REPORT_TABLES = [("weight", WEIGHT_SHEET), ("nutrition", NUTRITION_ROLLUP), ("workouts", WORKOUT_ROLLUP)]
+REPORT_RANGES = {"30": 30, "90": 90, "365": 365, "all": None}
+
+
+def today():
+    return datetime.today().strftime('%Y-%m-%d')
+
+def iso_date(value=None):
+    # "YYYY-MM-DD" for a date given by a user or client (today when empty);
+    # anything else is rejected before it is stored, as every read parses it
+    return normalize_date(str(value)) if value else today()
+
+def weight_kg(value, name="Weight"):
+    # A weight as a positive, finite float; NaN and infinity would pass every
+    # comparison check and be stored as NULL
+    weight = float(value)
+    if not math.isfinite(weight) or weight <= 0:
+        raise ValueError(f"{name} must be a positive number of kg: {value}")
+    return weight
+
+def estimated_deadline(current_weight, goal_weight, goal_type, start=None):
+    start = start or datetime.today()
+    if goal_type == "Weight Gain":
+        days_left = (goal_weight - current_weight) / 0.5  # 0.5kg per week
+    else:
+        days_left = (current_weight - goal_weight) / 0.5
+    return start + timedelta(days=days_left * 7)
+
+def day_plan(username, date, goal_type, vegetarian, plans=None):
+    # Meal and workout plan for one day, with the rows "Mark as Done" saves
+    plans = plans or load_plans()
+    plan = plans.lookup(datetime.fromisoformat(date).weekday(), goal_type, vegetarian, username)
+    owner = {"Username": username, "Date": date}
+    return {
+        "date": date,
+        "muscle_group": plan['muscle_group'],
+        "exercises": plan['exercises'],
+        "meal_plan": plan['meal_plan'],
+        "meals": [{**owner, **row} for row in plan['meal_rows']],
+        "workouts": [{**owner, **row} for row in plan['workout_rows']],
+    }
+
+
+class CompletionIndex:
+    # Status of each day of a goal for the calendar: COMPLETED or PARTIAL for
+    # days with logged meals/workouts, MISSED for the goal's past days without
+    # any. Built once per dashboard and kept current through mark_done, so
+    # browsing months never goes back to storage.
+    def __init__(self, days=None, start=None):
+        self.days = dict(days or {})  # "YYYY-MM-DD" -> COMPLETED | PARTIAL
+        self.start = start  # first day that can be missed
+
+    def statuses(self, until=None):
+        # Every day with a status, in date order
+        end = until or today()
+        days = dict(self.days)
+        if self.start:
+            for day in range((datetime.fromisoformat(end) - datetime.fromisoformat(self.start)).days):
+                date = (datetime.fromisoformat(self.start) + timedelta(days=day)).strftime('%Y-%m-%d')
+                days.setdefault(date, MISSED)
+        return sorted(days.items())
+
+    def mark_done(self, date):
+        self.days[date] = COMPLETED
+
+
+class TrackerService:
+    def __init__(self, storage=None, plans=None):
+        self.storage = storage if storage is not None else open_storage()
+        # Compiled once per service; see plans.load_plans for custom plans
+        self.plans = plans if plans is not None else load_plans()
+        # username -> stored password hash, loaded with one read of the Users
+        # sheet on first use
+        self._users = None
+        self._users_lock = threading.Lock()
+
+    def initialize(self):
+        # Creates the database, importing the legacy workbook on first run
+        self.storage.initialize()
+        with self._users_lock:
+            self._users = None
+
+    def _password_hash(self, username, reload=False):
+        # Users registered (or rehashed) by another instance are not in the
+        # index yet; a miss or a failed check re-reads just that user's row
+        with self._users_lock:
+            if self._users is None:
+                # Streamed from the backend: the cache would split the sheet
+                # into one partition per user
+                self._users = {}
+                for users in self.storage.iter_read(USERS_SHEET):
+                    self._users.update(zip(users['Username'], users['PasswordHash']))
+            if reload or username not in self._users:
+                record = self.storage.read(USERS_SHEET, username=username)
+                if record.empty:
+                    self._users.pop(username, None)
+                else:
+                    self._users[username] = record.iloc[0]['PasswordHash']
+            return self._users.get(username)
+
+    def _set_password_hash(self, username, password_hash, replace=True):
+        # Returns False when replace=False and the user already exists
+        row = {"Username": username, "PasswordHash": password_hash}
+        written, = self.storage.commit(Batch().upsert(USERS_SHEET, row, replace=replace))
+        if not written and not replace:
+            return False
+        with self._users_lock:
+            if self._users is not None:
+                self._users[username] = password_hash
+        return True
+
+    def user_exists(self, username):
+        return self._password_hash(username) is not None
+
+    @timed("service.register")
+    def register(self, username, password):
+        if self.user_exists(username):
+            return False
+        # Inserted only if still absent, so two concurrent registrations of
+        # the same name cannot both succeed
+        return self._set_password_hash(username, hash_password(password), replace=False)
+
+    @timed("service.authenticate")
+    def authenticate(self, username, password):
+        stored = self._password_hash(username)
+        if stored is None:
+            dummy_verify(password)
+            return None
+        matches, needs_rehash = verify_password(password, stored)
+        if not matches:
+            fresh = self._password_hash(username, reload=True)
+            if fresh is None or fresh == stored:
+                return None
+            matches, needs_rehash = verify_password(password, fresh)
+            if not matches:
+                return None
+        if needs_rehash:
+            # Legacy SHA-256 (or outdated parameters): upgrade while the
+            # plaintext is at hand
+            self._set_password_hash(username, hash_password(password))
+        return Session(self, username)
+
+    def session(self, username):
+        # Trusted local access (CLI, batch jobs) without a password check
+        if not self.user_exists(username):
+            raise ValueError(f"Unknown user: {username}")
+        return Session(self, username)
+
+
+class Session:
+    def __init__(self, service, username):
+        self.service = service
+        self.username = username
+
+    @property
+    def storage(self):
+        return self.service.storage
+
+    def commit(self, batch):
+        return self.storage.commit(batch)
+
+    def active_goal(self):
+        return self.storage.get_goal(self.username)
+
+    def start_goal(self, goal_type, current_weight, goal_weight, date=None):
+        if goal_type not in GOAL_TYPES:
+            raise ValueError(f"Unknown goal type: {goal_type}")
+        current_weight = weight_kg(current_weight, "Current weight")
+        goal_weight = weight_kg(goal_weight, "Goal weight")
+        if goal_type == "Weight Gain" and goal_weight <= current_weight:
+            raise ValueError("Goal must be greater than current weight")
+        if goal_type == "Weight Loss" and goal_weight >= current_weight:
+            raise ValueError("Goal must be less than current weight")
+        weight_data = {
+            "Username": self.username,
+            "Date": iso_date(date),
+            "Weight (kg)": current_weight,
+            "Goal Type": goal_type,
+            "Current Goal (kg)": goal_weight,
+            "Active": True
+        }
+        # The new goal record replaces any previous one
+        return Batch().set_goal(self.username, weight_data).upsert(WEIGHT_SHEET, weight_data)
+
+    def complete_goal(self, goal=None):
+        # Clears the active goal record; the weight history is left untouched
+        return self._batch(goal).clear_goal(self.username)
+
+    def _goal(self, goal):
+        # Callers that already hold the goal (the dashboard) pass it in, so a
+        # goal that is still queued for writing is not looked up
+        goal = goal or self.active_goal()
+        if goal is None:
+            raise ValueError("No active goal")
+        return goal
+
+    def _batch(self, goal):
+        # Writes based on a goal the caller holds only land if that goal is
+        # still the active one when they commit; another instance of the
+        # tracker may have completed or replaced it since (ConflictError)
+        batch = Batch()
+        if goal is not None:
+            batch.expect_goal(self.username, goal)
+        return batch
+
+    def log_weight(self, weight, date=None, goal=None):
+        weight = weight_kg(weight)
+        batch = self._batch(goal)
+        goal = self._goal(goal)
+        return batch.upsert(WEIGHT_SHEET, {
+            "Username": self.username,
+            "Date": iso_date(date),
+            "Weight (kg)": weight,
+            "Goal Type": goal['Goal Type'],
+            "Current Goal (kg)": goal['Current Goal (kg)'],
+            "Active": True
+        })
+
+    def day_plan(self, date, vegetarian, goal=None):
+        return day_plan(self.username, iso_date(date), self._goal(goal)['Goal Type'], vegetarian,
+                        self.service.plans)
+
+    def mark_day_done(self, date, vegetarian, goal=None):
+        plan = self.day_plan(date, vegetarian, goal)
+        # Meals and workouts land in a single transaction
+        return self._batch(goal).upsert(FOOD_SHEET, plan['meals']).upsert(WORKOUT_SHEET, plan['workouts'])
+
+    def completion_index(self, goal=None, start=None):
+        # A day is completed when at least its planned meals and completed
+        # exercises are logged, partial when only some are
+        goal = self._goal(goal)
+        food = self.report_data(FOOD_SHEET)
+        workouts = self.report_data(WORKOUT_SHEET)
+        days = food.groupby('Date').agg(meals=('Meal Type', 'size'), vegetarian=('Vegetarian', 'any')).join(
+            workouts[workouts['Completed']].groupby('Date').size().rename('exercises'), how='outer')
+        days = days.fillna({'meals': 0, 'vegetarian': False, 'exercises': 0})
+        statuses = {}
+        for date, meals, vegetarian, exercises in days.itertuples():
+            plan = self.service.plans.lookup(date.weekday(), goal['Goal Type'], vegetarian, self.username)
+            done = meals >= len(plan['meal_rows']) and exercises >= len(plan['workout_rows'])
+            statuses[date.strftime('%Y-%m-%d')] = COMPLETED if done else PARTIAL
+        return CompletionIndex(statuses, start or goal.get('Date'))
+
+    def estimated_deadline(self, goal=None, method="linear"):
+        # Trend of the recently logged weights when there are enough of them,
+        # otherwise the plan's assumed 0.5 kg per week from the start weight
+        from analytics import MIN_TREND_POINTS, weight_trends
+
+        goal = goal or self.active_goal()
+        if goal is None:
+            return None
+        weights = self.report_data(WEIGHT_SHEET)
+        if goal.get('Date'):
+            weights = weights[weights['Date'] >= goal['Date']]
+        trend = weight_trends(weights, pd.DataFrame([{"Username": self.username,
+                                                      "Current Goal (kg)": goal['Current Goal (kg)']}]), method)
+        if not trend.empty and trend['Points'].iloc[0] >= MIN_TREND_POINTS and pd.notna(trend['ETA'].iloc[0]):
+            return trend['ETA'].iloc[0].to_pydatetime()
+        return estimated_deadline(goal['Weight (kg)'], goal['Current Goal (kg)'], goal['Goal Type'])
+
+    def report_data(self, table):
+        return self.storage.read(table, username=self.username)
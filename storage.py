@@ -0,0 +1,850 @@
+import functools
+import glob
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime
+
+import pandas as pd
+
+from diagnostics import timed
+
+# Configuration
+DATA_FILE = "fitness_tracker_data.xlsx"  # import/export format only
+DB_FILE = "fitness_tracker_data.db"
+SHARD_DIR = "fitness_tracker_data"  # sharded backend: one database per group of users
+SHARD_COUNT = int(os.environ.get("FITNESS_TRACKER_SHARDS", "16"))
+STORAGE_BACKEND = os.environ.get("FITNESS_TRACKER_STORAGE", "sqlite")
+LOCK_TIMEOUT = 30  # seconds to wait for another process's write lock
+JOURNAL = os.environ.get("FITNESS_TRACKER_JOURNAL", "1") != "0"  # see journal.py
+
+USERS_SHEET = "Users"
+WEIGHT_SHEET = "Weight"
+FOOD_SHEET = "Food"
+WORKOUT_SHEET = "Workout"
+
+# Sheet schemas (column name, SQLite type) in workbook column order
+SHEET_SCHEMAS = {
+    USERS_SHEET: [("Username", "TEXT"), ("PasswordHash", "TEXT")],
+    WEIGHT_SHEET: [("Username", "TEXT"), ("Date", "TEXT"), ("Weight (kg)", "REAL"),
+                   ("Goal Type", "TEXT"), ("Current Goal (kg)", "REAL"), ("Active", "INTEGER")],
+    FOOD_SHEET: [("Username", "TEXT"), ("Date", "TEXT"), ("Meal Type", "TEXT"), ("Food Item", "TEXT"),
+                 ("Calories", "INTEGER"), ("Protein (g)", "INTEGER"), ("Vegetarian", "INTEGER")],
+    WORKOUT_SHEET: [("Username", "TEXT"), ("Date", "TEXT"), ("Muscle Group", "TEXT"), ("Exercise", "TEXT"),
+                    ("Sets", "INTEGER"), ("Reps", "INTEGER"), ("Duration (min)", "INTEGER"),
+                    ("Completed", "INTEGER")],
+}
+BOOL_COLUMNS = {"Active", "Vegetarian", "Completed"}
+REAL_COLUMNS = {name for schema in SHEET_SCHEMAS.values() for name, sql_type in schema if sql_type == "REAL"}
+
+# Compact in-memory dtypes of the sheet frames: repeated labels are
+# categoricals, dates datetime64 and counts the smallest integer type that
+# holds them (float32 when a column has missing values). The Users sheet keeps
+# plain strings, as every name in it is distinct.
+CATEGORY_COLUMNS = {"Username", "Goal Type", "Meal Type", "Food Item", "Muscle Group", "Exercise"}
+DATE_COLUMNS = {"Date"}
+COUNT_COLUMNS = {"Calories", "Protein (g)", "Sets", "Reps", "Duration (min)", "Exercises"}
+
+# Natural key of each sheet; writing a row whose key already exists replaces it
+SHEET_KEYS = {
+    USERS_SHEET: ["Username"],
+    WEIGHT_SHEET: ["Username", "Date"],
+    FOOD_SHEET: ["Username", "Date", "Meal Type"],
+    WORKOUT_SHEET: ["Username", "Date", "Exercise"],
+}
+
+# Per-user daily rollups used by the reports. They are kept up to date by
+# triggers on their source sheet, which recompute only the (Username, Date)
+# that a written row belongs to.
+NUTRITION_ROLLUP = "DailyNutrition"
+WORKOUT_ROLLUP = "DailyWorkout"
+ROLLUP_SCHEMAS = {
+    NUTRITION_ROLLUP: [("Username", "TEXT"), ("Date", "TEXT"), ("Calories", "INTEGER"), ("Protein (g)", "INTEGER")],
+    WORKOUT_ROLLUP: [("Username", "TEXT"), ("Date", "TEXT"), ("Muscle Group", "TEXT"), ("Exercises", "INTEGER")],
+}
+# rollup -> (source sheet, group-by columns, aggregate expressions)
+ROLLUP_SOURCES = {
+    NUTRITION_ROLLUP: (FOOD_SHEET, ["Username", "Date"], ['SUM("Calories")', 'SUM("Protein (g)")']),
+    WORKOUT_ROLLUP: (WORKOUT_SHEET, ["Username", "Date", "Muscle Group"], ["COUNT(*)"]),
+}
+
+SCHEMA_VERSION = 2
+
+# Active goal pointer: one record per user, kept apart from the Weight log so
+# starting or completing a goal never rewrites historical weight rows
+GOALS_SHEET = "Goals"
+GOALS_SCHEMA = [("Username", "TEXT"), ("Date", "TEXT"), ("Weight (kg)", "REAL"),
+                ("Goal Type", "TEXT"), ("Current Goal (kg)", "REAL")]
+
+# Last journal record applied, per journal file (see journal.py); written in
+# the same transaction as the record's own writes
+JOURNAL_SHEET = "Journal"
+
+
+class ConflictError(ValueError):
+    # A batch expected data that another writer has changed in the meantime
+    pass
+
+
+def sheet_columns(sheet_name):
+    schema = SHEET_SCHEMAS.get(sheet_name) or ROLLUP_SCHEMAS[sheet_name]
+    return [name for name, _ in schema]
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def _to_rows(data):
+    return [data] if isinstance(data, dict) else list(data)
+
+def _synchronized(method):
+    # Storage objects are shared between the Tk thread and the background writer
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def compact(sheet_name, df):
+    # Converts the columns that are not already in their compact dtype
+    if sheet_name == USERS_SHEET:
+        return df
+    for column in df.columns:
+        dtype = df[column].dtype
+        if column in CATEGORY_COLUMNS and not isinstance(dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+        elif column in DATE_COLUMNS and not pd.api.types.is_datetime64_any_dtype(dtype):
+            df[column] = pd.to_datetime(df[column], format="ISO8601")
+        elif column in COUNT_COLUMNS and dtype.itemsize > 2:
+            values = pd.to_numeric(df[column])
+            df[column] = pd.to_numeric(values, downcast="integer" if values.notna().all() else "float")
+    return df
+
+def concat_frames(sheet_name, frames):
+    # Categoricals with different categories concatenate to plain objects
+    return compact(sheet_name, pd.concat(frames, ignore_index=True))
+
+def _frame(sheet_name, records):
+    columns = sheet_columns(sheet_name)
+    df = pd.DataFrame.from_records(records, columns=columns)
+    for column in BOOL_COLUMNS.intersection(columns):
+        df[column] = df[column].astype(bool)
+    # NULLs (e.g. the goal of a weight logged without one) come back as NaN
+    for column in REAL_COLUMNS.intersection(columns):
+        df[column] = df[column].astype(float)
+    return compact(sheet_name, df)
+
+def _to_sql(value):
+    if value is None:
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime('%Y-%m-%d')
+    if hasattr(value, "item"):  # numpy scalars coming from DataFrames
+        value = value.item()
+    if isinstance(value, float) and value != value:  # NaN
+        return None
+    return value
+
+def normalize_date(value):
+    # Dates are stored as "YYYY-MM-DD" text: reads parse them as ISO 8601 and
+    # range queries compare them as text, so anything else is rejected
+    if hasattr(value, "strftime") and value is not pd.NaT:
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, str):
+        if len(value) == 10 and value[4] == value[7] == "-":
+            try:
+                date.fromisoformat(value)
+                return value
+            except ValueError:
+                pass
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date (expected YYYY-MM-DD): {value}")
+
+
+# --- SQLite backend ---
+# Each sheet is a table with the same columns as the workbook and a UNIQUE
+# constraint on its natural key, so writes are upserts that only touch the keys
+# being written. Username leads every key, so the key index also serves the
+# per-user lookups.
+class SqliteStorage:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()
+
+    @_synchronized
+    def connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    @_synchronized
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def data_files(self):
+        return [self.path, self.path + "-wal"]
+
+    @timed("sqlite.initialize")
+    @_synchronized
+    def initialize(self, workbook=DATA_FILE):
+        is_new = not os.path.exists(self.path)
+        conn = self.connect()
+        with conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for sheet_name in SHEET_SCHEMAS:
+                if version < 1 and self._table_exists(conn, sheet_name):
+                    self._rekey_table(conn, sheet_name)
+                else:
+                    self._create_table(conn, sheet_name)
+            for rollup in ROLLUP_SCHEMAS:
+                self._create_rollup(conn, rollup)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            has_goals = self._table_exists(conn, GOALS_SHEET)
+            columns = ", ".join(f"{_quote(name)} {sql_type}" for name, sql_type in GOALS_SCHEMA)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(GOALS_SHEET)} ({columns}, PRIMARY KEY (Username))")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(JOURNAL_SHEET)} (Name TEXT PRIMARY KEY, Seq INTEGER)")
+        if is_new and workbook and os.path.exists(workbook):
+            import_workbook(self, workbook)
+        elif not has_goals:
+            self._migrate_active_goals()
+
+    def _table_exists(self, conn, name):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (name,)).fetchone() is not None
+
+    def _create_table(self, conn, sheet_name):
+        columns = ", ".join(f"{_quote(name)} {sql_type}" for name, sql_type in SHEET_SCHEMAS[sheet_name])
+        key = ", ".join(_quote(name) for name in SHEET_KEYS[sheet_name])
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(sheet_name)} ({columns}, UNIQUE ({key}))")
+
+    def _rekey_table(self, conn, sheet_name):
+        # Version 0 tables were unique over every column; rebuild them on the
+        # natural key, keeping the most recently written row for each key
+        old_name = f"{sheet_name}_v0"
+        columns = ", ".join(_quote(c) for c in sheet_columns(sheet_name))
+        conn.execute(f"ALTER TABLE {_quote(sheet_name)} RENAME TO {_quote(old_name)}")
+        self._create_table(conn, sheet_name)
+        conn.execute(f"INSERT OR REPLACE INTO {_quote(sheet_name)} ({columns}) "
+                     f"SELECT {columns} FROM {_quote(old_name)} ORDER BY rowid")
+        conn.execute(f"DROP TABLE {_quote(old_name)}")
+
+    def _create_rollup(self, conn, rollup):
+        source, group, aggregates = ROLLUP_SOURCES[rollup]
+        columns = ", ".join(f"{_quote(name)} {sql_type}" for name, sql_type in ROLLUP_SCHEMAS[rollup])
+        key = ", ".join(_quote(c) for c in group)
+        select = (f"SELECT {key}, {', '.join(aggregates)} FROM {_quote(source)}")
+        insert = f"INSERT INTO {_quote(rollup)} ({', '.join(_quote(c) for c in sheet_columns(rollup))}) "
+        if not self._table_exists(conn, rollup):
+            conn.execute(f"CREATE TABLE {_quote(rollup)} ({columns}, PRIMARY KEY ({key}))")
+            conn.execute(insert + select + f" GROUP BY {key}")
+
+        def refresh(ref):
+            match = f"Username = {ref}.Username AND Date = {ref}.Date"
+            return (f"DELETE FROM {_quote(rollup)} WHERE {match}; "
+                    f"{insert}{select} WHERE {match} GROUP BY {key};")
+
+        for event, body in (("INSERT", refresh("NEW")), ("DELETE", refresh("OLD")),
+                            ("UPDATE", refresh("OLD") + " " + refresh("NEW"))):
+            trigger = _quote(f"{source}_{rollup}_{event.lower()}")
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON {_quote(source)} "
+                         f"BEGIN {body} END")
+
+    def _migrate_active_goals(self):
+        # Older databases only flag the active goal on the Weight rows; the most
+        # recent active row per user becomes that user's goal record
+        columns = ", ".join(_quote(name) for name, _ in GOALS_SCHEMA)
+        conn = self.connect()
+        with conn:
+            conn.execute(f"INSERT OR REPLACE INTO {_quote(GOALS_SHEET)} ({columns}) "
+                         f"SELECT {columns} FROM {_quote(WEIGHT_SHEET)} WHERE Active = 1 ORDER BY rowid")
+
+    def _upsert(self, conn, sheet_name, rows, replace=True):
+        # Returns the rows that were inserted or changed; rows identical to the
+        # stored ones are skipped, as are all existing keys when replace=False
+        columns = sheet_columns(sheet_name)
+        key = SHEET_KEYS[sheet_name]
+        values = [c for c in columns if c not in key]
+        sql = (f"INSERT INTO {_quote(sheet_name)} ({', '.join(_quote(c) for c in columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT ({', '.join(_quote(c) for c in key)}) DO ")
+        if values and replace:
+            sql += (f"UPDATE SET {', '.join(f'{_quote(c)} = excluded.{_quote(c)}' for c in values)} "
+                    f"WHERE {' OR '.join(f'{_quote(c)} IS NOT excluded.{_quote(c)}' for c in values)}")
+        else:
+            sql += "NOTHING"
+        converters = [normalize_date if c in DATE_COLUMNS else _to_sql for c in columns]
+        written = []
+        for row in rows:
+            record = tuple(convert(row.get(c)) for convert, c in zip(converters, columns))
+            if conn.execute(sql, record).rowcount:
+                written.append(record)
+        return written
+
+    @timed("sqlite.upsert", sheet=1)
+    @_synchronized
+    def upsert(self, sheet_name, data, replace=True):
+        rows = _to_rows(data)
+        if not rows:
+            return []
+        conn = self.connect()
+        with conn:
+            return self._upsert(conn, sheet_name, rows, replace)
+
+    @timed("sqlite.read", sheet=1)
+    @_synchronized
+    def read(self, sheet_name, username=None):
+        columns = sheet_columns(sheet_name)
+        sql = f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(sheet_name)}"
+        params = ()
+        if username is not None:
+            sql += " WHERE Username = ?"
+            params = (username,)
+        rows = self.connect().execute(sql + " ORDER BY rowid", params).fetchall()
+        return _frame(sheet_name, rows)
+
+    def iter_read(self, sheet_name, username=None, start=None, end=None, chunk_size=50000):
+        # Yields the sheet as DataFrames of at most chunk_size rows. A separate
+        # connection reads one WAL snapshot, so a long export neither holds the
+        # lock nor sees writes that land halfway through it.
+        columns = sheet_columns(sheet_name)
+        conditions, params = [], []
+        if username is not None:
+            conditions.append("Username = ?")
+            params.append(username)
+        if start is not None:
+            conditions.append("Date >= ?")
+            params.append(_to_sql(start))
+        if end is not None:
+            conditions.append("Date <= ?")
+            params.append(_to_sql(end))
+        sql = f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(sheet_name)}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                cursor = conn.execute(sql + " ORDER BY rowid", params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield _frame(sheet_name, rows)
+        finally:
+            conn.close()
+
+    def _get_goal(self, conn, username):
+        columns = [name for name, _ in GOALS_SCHEMA]
+        row = conn.execute(
+            f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(GOALS_SHEET)} WHERE Username = ?",
+            (username,)).fetchone()
+        return dict(zip(columns, row)) if row else None
+
+    @timed("sqlite.get_goal")
+    @_synchronized
+    def get_goal(self, username):
+        return self._get_goal(self.connect(), username)
+
+    def _set_goal(self, conn, username, goal):
+        columns = [name for name, _ in GOALS_SCHEMA]
+        values = [username if c == "Username" else normalize_date(goal.get(c)) if c in DATE_COLUMNS
+                  else _to_sql(goal.get(c)) for c in columns]
+        conn.execute(f"INSERT OR REPLACE INTO {_quote(GOALS_SHEET)} "
+                     f"({', '.join(_quote(c) for c in columns)}) VALUES ({', '.join('?' * len(columns))})",
+                     values)
+        return dict(zip(columns, values))
+
+    def _clear_goal(self, conn, username):
+        cursor = conn.execute(f"DELETE FROM {_quote(GOALS_SHEET)} WHERE Username = ?", (username,))
+        return cursor.rowcount > 0
+
+    def _expect_goal(self, conn, username, goal):
+        # Compare-and-set check: the stored goal must still match the fields of
+        # the goal the caller based its writes on (None: no active goal)
+        stored = self._get_goal(conn, username)
+        if goal is None:
+            matches = stored is None
+        else:
+            matches = stored is not None and all(
+                _to_sql(value) == stored[column] for column, value in goal.items()
+                if column in stored and column != "Username")
+        if not matches:
+            raise ConflictError(f"The goal for {username} was changed by another instance of the tracker; "
+                                f"reopen the tracker to load the current goal")
+        return True
+
+    def _journal_mark(self, conn, name, seq):
+        conn.execute(f"INSERT INTO {_quote(JOURNAL_SHEET)} (Name, Seq) VALUES (?, ?) "
+                     f"ON CONFLICT (Name) DO UPDATE SET Seq = max(Seq, excluded.Seq)", (name, seq))
+        return seq
+
+    @_synchronized
+    def journal_position(self, name, latest=False):
+        row = self.connect().execute(f"SELECT Seq FROM {_quote(JOURNAL_SHEET)} WHERE Name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    @timed("sqlite.checkpoint")
+    @_synchronized
+    def checkpoint(self):
+        # Copies the WAL into the database file. The WAL is synced first and
+        # the database file after, so every commit so far survives power loss.
+        # Returns False when a reader still using older WAL frames kept it
+        # from copying all of them.
+        busy, log, checkpointed = self.connect().execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        return not busy and log == checkpointed
+
+    @timed("sqlite.set_goal")
+    @_synchronized
+    def set_goal(self, username, goal):
+        conn = self.connect()
+        with conn:
+            return self._set_goal(conn, username, goal)
+
+    @timed("sqlite.clear_goal")
+    @_synchronized
+    def clear_goal(self, username):
+        conn = self.connect()
+        with conn:
+            return self._clear_goal(conn, username)
+
+    @timed("sqlite.commit")
+    @_synchronized
+    def commit(self, batch):
+        # Applies every operation of the batch in one transaction; returns the
+        # per-operation results in order. The write lock is taken up front, so
+        # expectations checked inside the batch hold until it commits even when
+        # other processes write to the same file.
+        handlers = {"upsert": self._upsert, "set_goal": self._set_goal, "clear_goal": self._clear_goal,
+                    "expect_goal": self._expect_goal, "journal_mark": self._journal_mark}
+        conn = self.connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return [handlers[op](conn, *args) for op, args in batch.operations]
+
+
+# --- Batched writes ---
+# Collects writes for several sheets so they are committed together in a single
+# transaction: either all of them land or none do.
+class Batch:
+    def __init__(self):
+        self.operations = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def upsert(self, sheet_name, data, replace=True):
+        rows = _to_rows(data)
+        if rows:
+            self.operations.append(("upsert", (sheet_name, rows, replace)))
+        return self
+
+    def set_goal(self, username, goal):
+        self.operations.append(("set_goal", (username, goal)))
+        return self
+
+    def clear_goal(self, username):
+        self.operations.append(("clear_goal", (username,)))
+        return self
+
+    def expect_goal(self, username, goal):
+        # The whole batch fails with ConflictError unless the user's goal still
+        # matches goal when it commits
+        self.operations.append(("expect_goal", (username, goal)))
+        return self
+
+    def journal_mark(self, name, seq):
+        # Records that journal record seq is applied, in the same transaction
+        self.operations.append(("journal_mark", (name, seq)))
+        return self
+
+
+# --- In-process sheet cache ---
+# Sheets are cached as per-user partitions (username -> DataFrame), loaded on
+# first use through the backend's Username index, so a lookup only ever touches
+# one user's rows. Writes made through the cache are applied to the affected
+# partitions; a change of the database files' signature (mtime/size, including
+# the WAL files) means another process wrote to them, so everything is dropped
+# and reloaded on the next read.
+class CachedStorage:
+    def __init__(self, backend):
+        self.backend = backend
+        self._sheets = {}  # sheet name -> {username: DataFrame}
+        self._complete = set()  # sheets whose partitions cover every user
+        self._goals = {}  # username -> goal record (None when no active goal)
+        self._signature = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def _file_signature(self):
+        signature = []
+        for path in self.backend.data_files():
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _check_fresh(self):
+        signature = self._file_signature()
+        if signature != self._signature:
+            if self._sheets:
+                self.invalidations += 1
+            self._sheets.clear()
+            self._complete.clear()
+            self._goals.clear()
+            self._signature = signature
+
+    @_synchronized
+    def invalidate(self, sheet_name=None):
+        if sheet_name is None:
+            self._sheets.clear()
+            self._complete.clear()
+            self._goals.clear()
+        elif sheet_name == GOALS_SHEET:
+            self._goals.clear()
+        else:
+            self._sheets.pop(sheet_name, None)
+            self._complete.discard(sheet_name)
+        self.invalidations += 1
+
+    @_synchronized
+    def initialize(self, *args, **kwargs):
+        self.backend.initialize(*args, **kwargs)
+        self._sheets.clear()
+        self._complete.clear()
+        self._goals.clear()
+        self._signature = self._file_signature()
+
+    def _partition(self, sheet_name, username):
+        self._check_fresh()
+        partitions = self._sheets.setdefault(sheet_name, {})
+        df = partitions.get(username)
+        if df is not None:
+            self.hits += 1
+        elif sheet_name in self._complete:
+            self.hits += 1
+            df = partitions[username] = _frame(sheet_name, [])
+        else:
+            self.misses += 1
+            df = partitions[username] = self.backend.read(sheet_name, username=username)
+        return df
+
+    def _load_sheet(self, sheet_name):
+        self._check_fresh()
+        if sheet_name in self._complete:
+            self.hits += 1
+        else:
+            self.misses += 1
+            df = self.backend.read(sheet_name)
+            self._sheets[sheet_name] = {
+                username: rows.reset_index(drop=True)
+                for username, rows in df.groupby('Username', sort=False, observed=True)
+            }
+            self._complete.add(sheet_name)
+        return self._sheets[sheet_name]
+
+    @timed("cache.read", sheet=1)
+    @_synchronized
+    def read(self, sheet_name, username=None):
+        if username is not None:
+            return self._partition(sheet_name, username).copy()
+        frames = [df for df in self._load_sheet(sheet_name).values() if not df.empty]
+        if not frames:
+            return _frame(sheet_name, [])
+        return concat_frames(sheet_name, frames)
+
+    def _apply_written(self, sheet_name, written):
+        # Rollups are recomputed by the backend; drop the affected users' cached
+        # rollup rows so the next read fetches just those users' days
+        for rollup, (source, _, _) in ROLLUP_SOURCES.items():
+            if source == sheet_name and written and rollup in self._sheets:
+                for username in {row[0] for row in written}:
+                    self._sheets[rollup].pop(username, None)
+                self._complete.discard(rollup)
+        partitions = self._sheets.get(sheet_name)
+        if written and partitions is not None:
+            key = SHEET_KEYS[sheet_name]
+            new_rows = _frame(sheet_name, written).drop_duplicates(key, keep='last')
+            for username, rows in new_rows.groupby('Username', sort=False, observed=True):
+                df = partitions.get(username)
+                if df is not None and not df.empty:
+                    replaced = pd.MultiIndex.from_frame(df[key]).isin(pd.MultiIndex.from_frame(rows[key]))
+                    partitions[username] = concat_frames(sheet_name, [df[~replaced], rows])
+                elif df is not None or sheet_name in self._complete:
+                    partitions[username] = rows.reset_index(drop=True)
+
+    @timed("cache.upsert", sheet=1)
+    @_synchronized
+    def upsert(self, sheet_name, data, replace=True):
+        self._check_fresh()
+        written = self.backend.upsert(sheet_name, data, replace)
+        self._apply_written(sheet_name, written)
+        self._signature = self._file_signature()
+        return written
+
+    @timed("cache.get_goal")
+    @_synchronized
+    def get_goal(self, username):
+        self._check_fresh()
+        if username in self._goals:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._goals[username] = self.backend.get_goal(username)
+        return self._goals[username]
+
+    @timed("cache.set_goal")
+    @_synchronized
+    def set_goal(self, username, goal):
+        self._check_fresh()
+        self._goals[username] = self.backend.set_goal(username, goal)
+        self._signature = self._file_signature()
+        return self._goals[username]
+
+    @timed("cache.clear_goal")
+    @_synchronized
+    def clear_goal(self, username):
+        self._check_fresh()
+        cleared = self.backend.clear_goal(username)
+        self._goals[username] = None
+        self._signature = self._file_signature()
+        return cleared
+
+    @timed("cache.commit")
+    @_synchronized
+    def commit(self, batch):
+        self._check_fresh()
+        results = self.backend.commit(batch)
+        for (op, args), result in zip(batch.operations, results):
+            if op == "upsert":
+                self._apply_written(args[0], result)
+            elif op == "set_goal":
+                self._goals[args[0]] = result
+            elif op == "clear_goal":
+                self._goals[args[0]] = None
+        self._signature = self._file_signature()
+        return results
+
+    @_synchronized
+    def checkpoint(self):
+        # Changes the database files without changing their data, so a cache
+        # that was fresh stays valid
+        self._check_fresh()
+        complete = self.backend.checkpoint()
+        self._signature = self._file_signature()
+        return complete
+
+    @_synchronized
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "users": {name: len(partitions) for name, partitions in self._sheets.items()},
+            "rows": {name: sum(len(df) for df in partitions.values())
+                     for name, partitions in self._sheets.items()},
+        }
+
+
+# --- Sharded SQLite backend ---
+# Users are spread over SHARD_COUNT database files by a stable hash of their
+# username, and everything a user owns (their Users row, sheets, rollups and
+# goal) lives in their shard. Writers for users in different shards never wait
+# on each other's locks, so several app instances on a shared drive write in
+# parallel; writers in the same shard are serialised by SQLite's file lock and
+# each commit is atomic per shard. A batch touching users in several shards is
+# committed shard by shard; a journaled batch records its journal position in
+# each of those shards, so a replay re-applies only the shards it missed.
+class ShardedStorage:
+    def __init__(self, path=SHARD_DIR, shards=SHARD_COUNT):
+        self.path = path
+        # An existing directory keeps the shard count it was created with
+        existing = glob.glob(os.path.join(path, "shard-*.db"))
+        count = len(existing) or shards
+        self.shards = [SqliteStorage(os.path.join(path, f"shard-{i:02d}.db")) for i in range(count)]
+
+    def shard(self, username):
+        # crc32 rather than hash(): it must agree across processes
+        return self.shards[zlib.crc32(str(username).encode()) % len(self.shards)]
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def data_files(self):
+        return [path for shard in self.shards for path in shard.data_files()]
+
+    def initialize(self, workbook=DATA_FILE):
+        is_new = not os.path.isdir(self.path)
+        os.makedirs(self.path, exist_ok=True)
+        for shard in self.shards:
+            shard.initialize(workbook=None)
+        if is_new and workbook and os.path.exists(workbook):
+            import_workbook(self, workbook)
+
+    def _split_rows(self, rows):
+        by_shard = {}
+        for row in rows:
+            by_shard.setdefault(self.shard(row["Username"]), []).append(row)
+        return by_shard
+
+    def upsert(self, sheet_name, data, replace=True):
+        written = []
+        for shard, rows in self._split_rows(_to_rows(data)).items():
+            written.extend(shard.upsert(sheet_name, rows, replace))
+        return written
+
+    def read(self, sheet_name, username=None):
+        if username is not None:
+            return self.shard(username).read(sheet_name, username=username)
+        frames = [df for df in (shard.read(sheet_name) for shard in self.shards) if not df.empty]
+        if not frames:
+            return _frame(sheet_name, [])
+        return concat_frames(sheet_name, frames)
+
+    def iter_read(self, sheet_name, username=None, **kwargs):
+        shards = [self.shard(username)] if username is not None else self.shards
+        for shard in shards:
+            yield from shard.iter_read(sheet_name, username=username, **kwargs)
+
+    def get_goal(self, username):
+        return self.shard(username).get_goal(username)
+
+    def set_goal(self, username, goal):
+        return self.shard(username).set_goal(username, goal)
+
+    def clear_goal(self, username):
+        return self.shard(username).clear_goal(username)
+
+    def journal_position(self, name, latest=False):
+        # Each shard records the journal records it has applied: the journal
+        # is applied up to the shard furthest behind, and latest=True gives
+        # the newest sequence number any shard has seen
+        return (max if latest else min)(shard.journal_position(name) for shard in self.shards)
+
+    def checkpoint(self):
+        return all([shard.checkpoint() for shard in self.shards])
+
+    def commit(self, batch):
+        # Splits the batch into one sub-batch per shard, then reassembles the
+        # results in the order of the original operations
+        batches = {}
+        parts = []  # per operation: [(shard, index in its sub-batch)]
+        for op, args in batch.operations:
+            if op == "upsert":
+                targets = self._split_rows(args[1]).items()
+                operations = [(shard, ("upsert", (args[0], rows) + args[2:])) for shard, rows in targets]
+            elif op == "journal_mark":
+                # Committed with every shard's writes, so each shard records
+                # the batch atomically with its part of it
+                operations = [(shard, (op, args)) for shard in (list(batches) or self.shards)]
+            else:
+                operations = [(self.shard(args[0]), (op, args))]
+            part = []
+            for shard, operation in operations:
+                sub_batch = batches.setdefault(shard, Batch())
+                part.append((shard, len(sub_batch)))
+                sub_batch.operations.append(operation)
+            parts.append((op, part))
+        results = {}
+        for shard, sub_batch in batches.items():
+            mark = _journal_mark(sub_batch)
+            if mark is not None and shard.journal_position(mark[0]) >= mark[1]:
+                # A replay of a batch this shard committed before a crash
+                # stopped the others
+                results[shard] = [[] if op == "upsert" else None for op, _ in sub_batch.operations]
+            else:
+                results[shard] = shard.commit(sub_batch)
+        if len(batches) == 1:
+            return next(iter(results.values()))
+        return [[row for shard, i in part for row in results[shard][i]] if op == "upsert"
+                else results[part[0][0]][part[0][1]] for op, part in parts]
+
+
+def _journal_mark(batch):
+    # The (name, seq) a batch is journaled under, if any
+    return next((args for op, args in batch.operations if op == "journal_mark"), None)
+
+
+BACKENDS = {
+    "sqlite": SqliteStorage,
+    "sharded": ShardedStorage,
+}
+
+def open_storage(backend=STORAGE_BACKEND, cache=True, journal=JOURNAL, **kwargs):
+    # journal=False for read-only use (batch jobs, exports)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    storage = BACKENDS[backend](**kwargs)
+    if cache:
+        storage = CachedStorage(storage)
+    if journal:
+        from journal import JournaledStorage
+        storage = JournaledStorage(storage)
+    return storage
+
+
+# --- Workbook import/export ---
+@timed("workbook.import")
+def _workbook_date(value, sheet_name, row):
+    try:
+        return normalize_date(value)
+    except ValueError as e:
+        raise ValueError(f"{sheet_name} row {row}: {e}") from None
+
+def import_workbook(storage, path=DATA_FILE):
+    # The whole workbook is imported in one transaction
+    sheets = pd.read_excel(path, sheet_name=None)
+    batch = Batch()
+    for sheet_name in SHEET_SCHEMAS:
+        if sheet_name in sheets:
+            df = sheets[sheet_name].reindex(columns=sheet_columns(sheet_name))
+            df = df.astype(object).where(df.notna(), None)
+            if 'Date' in df.columns:
+                # Date cells come back as timestamps, hand-typed ones as text
+                df['Date'] = [_workbook_date(value, sheet_name, row) for row, value in enumerate(df['Date'], 2)]
+            batch.upsert(sheet_name, df.to_dict("records"))
+    if GOALS_SHEET in sheets:
+        goals = sheets[GOALS_SHEET]
+    elif WEIGHT_SHEET in sheets and 'Active' in sheets[WEIGHT_SHEET]:
+        # Legacy workbooks flag the active goal on the Weight rows
+        weights = sheets[WEIGHT_SHEET]
+        goals = weights[weights['Active'] == True].groupby('Username').tail(1)
+    else:
+        goals = pd.DataFrame()
+    for goal in goals.to_dict("records"):
+        batch.set_goal(goal["Username"], goal)
+    results = storage.commit(batch)
+    return sum(len(result) if isinstance(result, list) else 1 for result in results)
+
+@timed("workbook.export")
+def export_workbook(storage, path=DATA_FILE):
+    # Written to a temporary file and renamed over the target, so a crash
+    # mid-export never leaves a half-written workbook behind
+    base, ext = os.path.splitext(path)
+    tmp_path = f"{base}.tmp{ext}"
+    with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+        for sheet_name in SHEET_SCHEMAS:
+            df = storage.read(sheet_name)
+            if 'Date' in df.columns:
+                # Dates stay text in the workbook, as the import expects
+                df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        goals = [storage.get_goal(username) for username in storage.read(USERS_SHEET)['Username']]
+        pd.DataFrame([goal for goal in goals if goal], columns=[name for name, _ in GOALS_SCHEMA]).to_excel(
+            writer, sheet_name=GOALS_SHEET, index=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,102 @@
+import queue
+import sys
+import threading
+
+from diagnostics import log_exception
+
+_STOP = object()
+
+
+# --- Background writer ---
+# Storage writes are queued and run in order on a single worker thread so Tk
+# callbacks return immediately. Results and errors are put on a second queue
+# that the Tk thread drains with root.after, so callbacks (including error
+# message boxes) always run on the Tk thread.
+class BackgroundWriter:
+    def __init__(self, poll_interval=50):
+        self.poll_interval = poll_interval
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._root = None
+        self._thread = None  # started on the first submit
+        self._start_lock = threading.Lock()
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            try:
+                if task is _STOP:
+                    return
+                func, args, kwargs, on_done, on_error = task
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    self._results.put((on_error, e, True))
+                else:
+                    self._results.put((on_done, result, False))
+            finally:
+                self._tasks.task_done()
+
+    def submit(self, func, *args, on_done=None, on_error=None, **kwargs):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+                self._thread.start()
+        self._tasks.put((func, args, kwargs, on_done, on_error))
+
+    def attach(self, root):
+        # Start delivering results to callbacks on root's event loop
+        self._root = root
+        root.after(self.poll_interval, self._poll, root)
+
+    def _poll(self, root):
+        if root is not self._root:
+            return
+        try:
+            self.dispatch()
+        finally:
+            try:
+                root.after(self.poll_interval, self._poll, root)
+            except Exception:
+                pass  # root was destroyed
+
+    def dispatch(self):
+        while True:
+            try:
+                callback, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if failed:
+                log_exception("writer.task", value)
+            if callback is not None:
+                # One failing callback must not keep the others (such as a
+                # later save's error message) from running
+                try:
+                    callback(value)
+                except Exception as e:
+                    log_exception("writer.callback", e)
+                    print(f"Background write callback failed: {e}", file=sys.stderr)
+            elif failed:
+                print(f"Background write failed: {value}", file=sys.stderr)
+
+    def pending(self):
+        # Writes queued or running
+        return self._tasks.unfinished_tasks
+
+    def flush(self):
+        # Block until every queued write has been applied
+        self._tasks.join()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._tasks.put(_STOP)
+            self._thread.join()
+        self._root = None
+        while True:
+            try:
+                _, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if failed:
+                log_exception("writer.task", value)
+                print(f"Background write failed: {value}", file=sys.stderr)